@@ -0,0 +1,187 @@
+"""
+Benchmarks the connection scan journey planner on a synthetic timetable.
+
+Builds a network of random routes with trips running all day, then times
+earliest-arrival queries between random stops. Answers are checked against a
+naive planner that relaxes whole trips until nothing changes, and a trip
+crossing midnight is checked explicitly.
+
+Run from the repository root:
+
+    python benchmarks/journey_planner.py --routes 60 --queries 2000
+"""
+
+import argparse
+import random
+import statistics
+import sys
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from app.models.bus_journey import MINUTES_PER_DAY, ConnectionScan  # noqa: E402
+
+
+def synthetic_trips(
+    stops: int, routes: int, seed: int
+) -> list[tuple[int, list[tuple[int, int]]]]:
+    """
+    Returns (schedule id, [(stop id, minute of day), ...]) for trips of random
+    routes, each running every 10 to 30 minutes from 05:00 until midnight.
+    """
+    rng = random.Random(seed)
+    trips = []
+
+    for _ in range(routes):
+        route_stops = rng.sample(range(1, stops + 1), rng.randint(6, 15))
+        hops = [rng.randint(2, 8) for _ in route_stops[1:]]
+        headway = rng.randint(10, 30)
+
+        for start in range(5 * 60 + rng.randint(0, headway), MINUTES_PER_DAY, headway):
+            minute = start
+            times = [(route_stops[0], minute % MINUTES_PER_DAY)]
+            for stop, hop in zip(route_stops[1:], hops):
+                minute += hop
+                times.append((stop, minute % MINUTES_PER_DAY))
+
+            trips.append((len(trips) + 1, times))
+
+    return trips
+
+
+def naive_earliest_arrival(
+    trips: list[tuple[int, list[tuple[int, int]]]],
+    from_stop: int,
+    to_stop: int,
+    depart_after: int,
+) -> int | None:
+    """
+    Relaxes whole trips until nothing changes. For every stop already reached
+    it boards the first run of each trip through that stop, whichever day
+    that run started on, so it shares nothing with the scan's connection
+    layout. Like the scan, it only rides connections leaving within a day of
+    `depart_after`.
+    """
+    # Minutes since the trip's first departure, growing past midnight.
+    timelines = []
+    for _, stops in trips:
+        timeline = []
+        day = 0
+        for stop, minute in stops:
+            if timeline and minute + day < timeline[-1][1]:
+                day += MINUTES_PER_DAY
+            timeline.append((stop, minute + day))
+        timelines.append(timeline)
+
+    earliest = {from_stop: depart_after}
+    changed = True
+    while changed:
+        changed = False
+        for timeline in timelines:
+            for position, (stop, minute) in enumerate(timeline[:-1]):
+                reached = earliest.get(stop)
+                if reached is None:
+                    continue
+
+                # The run of this trip leaving `stop` first at or after
+                # `reached`, counting runs that started the day before.
+                shift = -(-(reached - minute) // MINUTES_PER_DAY) * MINUTES_PER_DAY
+                for hop in range(position + 1, len(timeline)):
+                    if timeline[hop - 1][1] + shift > depart_after + MINUTES_PER_DAY:
+                        break
+
+                    later, arrival = timeline[hop]
+                    if arrival + shift < earliest.get(later, arrival + shift + 1):
+                        earliest[later] = arrival + shift
+                        changed = True
+
+    return earliest.get(to_stop)
+
+
+def check_midnight() -> None:
+    """
+    A bus leaving at 23:50 and reaching its later stops after midnight can be
+    boarded at those stops in the early morning.
+    """
+    scan = ConnectionScan([(1, [(1, 23 * 60 + 50), (2, 10), (3, 30)])])
+
+    legs = scan.earliest_arrival(2, 3, 5)
+    if legs is None or (legs[0].departure, legs[-1].arrival) != (10, 30):
+        raise SystemExit("the 00:10 departure from an overnight trip was missed")
+
+    legs = scan.earliest_arrival(1, 3, 23 * 60)
+    if legs is None or legs[-1].arrival != MINUTES_PER_DAY + 30:
+        raise SystemExit("an overnight trip did not arrive the next day")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--stops", type=int, default=200)
+    parser.add_argument("--routes", type=int, default=60)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--checked", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    check_midnight()
+    trips = synthetic_trips(args.stops, args.routes, args.seed)
+
+    start = perf_counter()
+    scan = ConnectionScan(trips)
+    build_ms = (perf_counter() - start) * 1000
+
+    print(f"trips:        {len(trips)}")
+    print(f"connections:  {len(scan)}")
+    print(f"build:        {build_ms:.1f} ms")
+
+    rng = random.Random(args.seed + 1)
+    queries = [
+        (
+            rng.randint(1, args.stops),
+            rng.randint(1, args.stops),
+            rng.randrange(MINUTES_PER_DAY),
+        )
+        for _ in range(args.queries)
+    ]
+
+    timings = []
+    answers = []
+    for from_stop, to_stop, depart_after in queries:
+        start = perf_counter()
+        legs = scan.earliest_arrival(from_stop, to_stop, depart_after)
+        timings.append((perf_counter() - start) * 1e6)
+        answers.append(legs)
+
+    found = sum(legs is not None for legs in answers)
+    timings.sort()
+    print(f"queries:      {len(queries)} ({found} reachable)")
+    print(f"mean:         {statistics.mean(timings):.0f} us")
+    print(f"p50:          {timings[len(timings) // 2]:.0f} us")
+    print(f"p99:          {timings[int(len(timings) * 0.99)]:.0f} us")
+
+    naive_us = 0.0
+    for (from_stop, to_stop, depart_after), legs in list(zip(queries, answers))[
+        : args.checked
+    ]:
+        start = perf_counter()
+        expected = naive_earliest_arrival(trips, from_stop, to_stop, depart_after)
+        naive_us += (perf_counter() - start) * 1e6
+
+        if from_stop == to_stop:
+            continue
+
+        arrival = legs[-1].arrival if legs else None
+        if arrival != expected:
+            raise SystemExit(
+                f"mismatch for {from_stop} -> {to_stop} after {depart_after}: "
+                f"{arrival} != {expected}"
+            )
+
+    checked = min(args.checked, len(queries))
+    if checked > 0:
+        print(f"naive mean:   {naive_us / checked:.0f} us ({checked} answers checked)")
+
+
+if __name__ == "__main__":
+    main()
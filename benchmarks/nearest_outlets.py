@@ -0,0 +1,101 @@
+"""
+Checks and times the nearest outlet ranking on synthetic outlets.
+
+Scatters outlets at random around campus, then ranks the k nearest to random
+query points three ways: by haversine distance alone, with NearestIndex (a
+haversine prefilter re-ranked by geodesic distance) and by brute-force
+geodesic distance. NearestIndex must agree with the brute force exactly; how
+often haversine alone disagrees is reported.
+
+Run from the repository root:
+
+    python benchmarks/nearest_outlets.py --outlets 2000 --queries 100
+"""
+
+import argparse
+import random
+import statistics
+import sys
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from app.models.outlet_geo import NearestIndex, geodesic_km  # noqa: E402
+
+CAMPUS = (23.2114, 72.6842)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--outlets", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--spread", type=float, default=0.3, help="in degrees")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    def around_campus() -> tuple[float, float]:
+        return (
+            CAMPUS[0] + rng.uniform(-args.spread, args.spread),
+            CAMPUS[1] + rng.uniform(-args.spread, args.spread),
+        )
+
+    points = {id: around_campus() for id in range(1, args.outlets + 1)}
+    index = NearestIndex(points)
+    positions = {id: position for position, id in enumerate(index.ids.tolist())}
+
+    reordered = 0
+    different_set = 0
+    max_error = 0.0
+    index_us = []
+    brute_force_us = []
+
+    for _ in range(args.queries):
+        latitude, longitude = around_campus()
+
+        start = perf_counter()
+        nearest = index.nearest(latitude, longitude, args.k)
+        index_us.append((perf_counter() - start) * 1e6)
+
+        start = perf_counter()
+        expected = sorted(
+            (geodesic_km(latitude, longitude, point), id)
+            for id, point in points.items()
+        )[: args.k]
+        brute_force_us.append((perf_counter() - start) * 1e6)
+
+        if [id for id, _ in nearest] != [id for _, id in expected]:
+            raise SystemExit(
+                f"mismatch at ({latitude}, {longitude}): "
+                f"{[id for id, _ in nearest]} != {[id for _, id in expected]}"
+            )
+
+        distances = index.distances(latitude, longitude)
+        haversine = sorted(range(len(distances)), key=lambda i: distances[i])
+        haversine = [int(index.ids[i]) for i in haversine[: args.k]]
+
+        if haversine != [id for _, id in expected]:
+            reordered += 1
+        if set(haversine) != {id for _, id in expected}:
+            different_set += 1
+
+        for distance, id in expected:
+            if distance > 0:
+                error = abs(distances[positions[id]] - distance) / distance
+                max_error = max(max_error, error)
+
+    print(f"outlets:      {args.outlets} within {args.spread} degrees of campus")
+    print(f"queries:      {args.queries}, k = {args.k}")
+    print(f"haversine:    top {args.k} reordered in {reordered} queries")
+    print(f"              different top {args.k} set in {different_set} queries")
+    print(f"              largest relative distance error {max_error:.2%}")
+    print("NearestIndex: identical to the geodesic brute force in every query")
+    print(f"index mean:   {statistics.mean(index_us):.0f} us")
+    print(f"brute force:  {statistics.mean(brute_force_us):.0f} us")
+
+
+if __name__ == "__main__":
+    main()
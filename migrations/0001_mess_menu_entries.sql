@@ -0,0 +1,92 @@
+-- Moves mess menus from 28 item id array columns (monday_breakfast ...
+-- sunday_dinner) to one mess_menu_entries row per item in a day/meal slot.
+--
+-- Ids in the old arrays that no longer exist in mess_menu_items are dropped,
+-- since the new table references its items.
+
+BEGIN;
+
+CREATE TABLE mess_menu_entries (
+    menu_id integer NOT NULL REFERENCES mess_menus (id) ON DELETE CASCADE,
+    day text NOT NULL CHECK (
+        day IN ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+    ),
+    meal text NOT NULL CHECK (meal IN ('breakfast', 'lunch', 'snacks', 'dinner')),
+    position integer NOT NULL,
+    item_id integer NOT NULL REFERENCES mess_menu_items (id) ON DELETE CASCADE,
+    PRIMARY KEY (menu_id, day, meal, position)
+);
+
+CREATE INDEX mess_menu_entries_item_id_idx ON mess_menu_entries (item_id);
+
+INSERT INTO mess_menu_entries (menu_id, day, meal, position, item_id)
+SELECT mm.id, slot.day, slot.meal, entry.position - 1, entry.item_id::integer
+FROM mess_menus mm
+CROSS JOIN LATERAL (
+    VALUES
+        ('monday', 'breakfast', to_jsonb(mm.monday_breakfast)),
+        ('monday', 'lunch', to_jsonb(mm.monday_lunch)),
+        ('monday', 'snacks', to_jsonb(mm.monday_snacks)),
+        ('monday', 'dinner', to_jsonb(mm.monday_dinner)),
+        ('tuesday', 'breakfast', to_jsonb(mm.tuesday_breakfast)),
+        ('tuesday', 'lunch', to_jsonb(mm.tuesday_lunch)),
+        ('tuesday', 'snacks', to_jsonb(mm.tuesday_snacks)),
+        ('tuesday', 'dinner', to_jsonb(mm.tuesday_dinner)),
+        ('wednesday', 'breakfast', to_jsonb(mm.wednesday_breakfast)),
+        ('wednesday', 'lunch', to_jsonb(mm.wednesday_lunch)),
+        ('wednesday', 'snacks', to_jsonb(mm.wednesday_snacks)),
+        ('wednesday', 'dinner', to_jsonb(mm.wednesday_dinner)),
+        ('thursday', 'breakfast', to_jsonb(mm.thursday_breakfast)),
+        ('thursday', 'lunch', to_jsonb(mm.thursday_lunch)),
+        ('thursday', 'snacks', to_jsonb(mm.thursday_snacks)),
+        ('thursday', 'dinner', to_jsonb(mm.thursday_dinner)),
+        ('friday', 'breakfast', to_jsonb(mm.friday_breakfast)),
+        ('friday', 'lunch', to_jsonb(mm.friday_lunch)),
+        ('friday', 'snacks', to_jsonb(mm.friday_snacks)),
+        ('friday', 'dinner', to_jsonb(mm.friday_dinner)),
+        ('saturday', 'breakfast', to_jsonb(mm.saturday_breakfast)),
+        ('saturday', 'lunch', to_jsonb(mm.saturday_lunch)),
+        ('saturday', 'snacks', to_jsonb(mm.saturday_snacks)),
+        ('saturday', 'dinner', to_jsonb(mm.saturday_dinner)),
+        ('sunday', 'breakfast', to_jsonb(mm.sunday_breakfast)),
+        ('sunday', 'lunch', to_jsonb(mm.sunday_lunch)),
+        ('sunday', 'snacks', to_jsonb(mm.sunday_snacks)),
+        ('sunday', 'dinner', to_jsonb(mm.sunday_dinner))
+) AS slot (day, meal, item_ids)
+CROSS JOIN LATERAL jsonb_array_elements_text(
+    CASE WHEN jsonb_typeof(slot.item_ids) = 'array'
+    THEN slot.item_ids ELSE '[]'::jsonb END
+) WITH ORDINALITY AS entry (item_id, position)
+WHERE entry.item_id::integer IN (SELECT id FROM mess_menu_items);
+
+ALTER TABLE mess_menus
+    DROP COLUMN monday_breakfast,
+    DROP COLUMN monday_lunch,
+    DROP COLUMN monday_snacks,
+    DROP COLUMN monday_dinner,
+    DROP COLUMN tuesday_breakfast,
+    DROP COLUMN tuesday_lunch,
+    DROP COLUMN tuesday_snacks,
+    DROP COLUMN tuesday_dinner,
+    DROP COLUMN wednesday_breakfast,
+    DROP COLUMN wednesday_lunch,
+    DROP COLUMN wednesday_snacks,
+    DROP COLUMN wednesday_dinner,
+    DROP COLUMN thursday_breakfast,
+    DROP COLUMN thursday_lunch,
+    DROP COLUMN thursday_snacks,
+    DROP COLUMN thursday_dinner,
+    DROP COLUMN friday_breakfast,
+    DROP COLUMN friday_lunch,
+    DROP COLUMN friday_snacks,
+    DROP COLUMN friday_dinner,
+    DROP COLUMN saturday_breakfast,
+    DROP COLUMN saturday_lunch,
+    DROP COLUMN saturday_snacks,
+    DROP COLUMN saturday_dinner,
+    DROP COLUMN sunday_breakfast,
+    DROP COLUMN sunday_lunch,
+    DROP COLUMN sunday_snacks,
+    DROP COLUMN sunday_dinner;
+
+COMMIT;
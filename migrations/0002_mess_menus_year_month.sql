@@ -0,0 +1,4 @@
+-- Lets /mess_menu filter by year and month and page by id without scanning
+-- every menu.
+
+CREATE INDEX mess_menus_year_month_id_idx ON mess_menus (year, month, id);
@@ -0,0 +1,10 @@
+-- Indexes behind the SQL filters of /search/food-outlet. Substring matches
+-- (ILIKE '%...%') on names and landmarks use trigram GIN indexes.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX food_outlets_name_trgm_idx ON food_outlets USING gin (name gin_trgm_ops);
+CREATE INDEX food_outlets_landmark_trgm_idx ON food_outlets USING gin (landmark gin_trgm_ops);
+CREATE INDEX food_outlets_rating_idx ON food_outlets (rating);
+
+CREATE INDEX food_outlet_menu_items_food_outlet_id_idx ON food_outlet_menu_items (food_outlet_id);
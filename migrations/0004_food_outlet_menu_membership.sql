@@ -0,0 +1,20 @@
+-- Makes food_outlet_menu_items.food_outlet_id the only record of which outlet
+-- an item belongs to, and drops the food_outlets.menu id list.
+
+BEGIN;
+
+-- Items listed in an outlet's menu take that outlet, in case the two ever
+-- disagreed.
+UPDATE food_outlet_menu_items i
+SET food_outlet_id = o.id
+FROM food_outlets o
+CROSS JOIN LATERAL jsonb_array_elements_text(
+    CASE WHEN jsonb_typeof(to_jsonb(o.menu)) = 'array'
+    THEN to_jsonb(o.menu) ELSE '[]'::jsonb END
+) AS entry (item_id)
+WHERE i.id = entry.item_id::integer
+    AND i.food_outlet_id IS DISTINCT FROM o.id;
+
+ALTER TABLE food_outlets DROP COLUMN menu;
+
+COMMIT;
@@ -1,7 +1,10 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
 from fastapi.security.api_key import APIKey
 from fastapi.middleware.cors import CORSMiddleware
 from app.auth.key import get_api_key
+from app.db import create_pool, shutdown_executor
+from app.utils.identity_map import IdentityMapMiddleware
 from config import app_description, tags_metadata
 from fastapi.openapi.utils import get_openapi
 from fastapi.openapi.docs import get_swagger_ui_html
@@ -13,8 +16,17 @@ from app.routers.bus import router as BusRouter
 # from fastapi.templating import Jinja2Templates
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.db_pool = create_pool()
+    yield
+    shutdown_executor()
+    app.state.db_pool.close()
+
+
 def create_app():
     app = FastAPI(
+        lifespan=lifespan,
         docs_url=None,
         redoc_url=None,
         openapi_url="/api/v1/openapi.json",
@@ -26,6 +38,8 @@ def create_app():
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    # Model loaders share one instance per (class, id) for the whole request.
+    app.add_middleware(IdentityMapMiddleware)
     return app
 
 
@@ -1,4 +1,11 @@
 from config import db_config
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, Request, status
+from typing import Any, Callable, Iterator, TypeVar
+import asyncio
+import threading
+import time
 import psycopg2
 import psycopg2.extensions
 
@@ -17,3 +24,235 @@ def connect() -> psycopg2.extensions.connection:
 
 def disconnect(con: psycopg2.extensions.connection):
     con.close()
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of psycopg2 connections.
+
+    At least `min_size` connections are kept open and at most `max_size` are
+    ever open at once. Connections idle for longer than `max_idle` seconds are
+    closed (down to `min_size`), and `acquire` gives up with a
+    `PoolTimeoutError` after `acquire_timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 1,
+        max_size: int = 10,
+        max_idle: float = 300,
+        acquire_timeout: float = 10,
+    ) -> None:
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid connection pool size")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.acquire_timeout = acquire_timeout
+
+        self._idle: deque[tuple[psycopg2.extensions.connection, float]] = deque()
+        self._size = 0
+        self._closed = False
+        self._lock = threading.Condition()
+
+    def open(self) -> None:
+        for _ in range(self.min_size):
+            con = connect()
+            with self._lock:
+                self._size += 1
+                self._idle.append((con, time.monotonic()))
+
+    def acquire(self) -> psycopg2.extensions.connection:
+        deadline = time.monotonic() + self.acquire_timeout
+
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed")
+
+                self._reap()
+
+                if len(self._idle) > 0:
+                    con, _ = self._idle.pop()
+                    if con.closed:
+                        self._size -= 1
+                        continue
+                    return con
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"Timed out after {self.acquire_timeout}s waiting for a connection"
+                    )
+                self._lock.wait(remaining)
+
+        # Open the new connection outside the lock so that other threads can
+        # keep acquiring and releasing while the handshake is in progress.
+        try:
+            return connect()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+
+    def release(self, con: psycopg2.extensions.connection) -> None:
+        if not con.closed:
+            try:
+                if (
+                    con.get_transaction_status()
+                    != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+                ):
+                    con.rollback()
+            except psycopg2.Error:
+                disconnect(con)
+
+        with self._lock:
+            if con.closed or self._closed:
+                if not con.closed:
+                    disconnect(con)
+                self._size -= 1
+            else:
+                self._idle.append((con, time.monotonic()))
+            self._lock.notify()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            while len(self._idle) > 0:
+                con, _ = self._idle.popleft()
+                disconnect(con)
+                self._size -= 1
+            self._lock.notify_all()
+
+    def _reap(self) -> None:
+        # The least recently used connections sit at the left end of the deque.
+        now = time.monotonic()
+        while (
+            len(self._idle) > 0
+            and self._size > self.min_size
+            and now - self._idle[0][1] > self.max_idle
+        ):
+            con, _ = self._idle.popleft()
+            disconnect(con)
+            self._size -= 1
+
+
+def create_pool() -> ConnectionPool:
+    pool = ConnectionPool(
+        min_size=db_config["pool-min-size"],
+        max_size=db_config["pool-max-size"],
+        max_idle=db_config["pool-max-idle"],
+        acquire_timeout=db_config["pool-acquire-timeout"],
+    )
+    pool.open()
+
+    return pool
+
+
+def get_db(request: Request) -> Iterator[psycopg2.extensions.connection]:
+    pool: ConnectionPool = request.app.state.db_pool
+
+    try:
+        con = pool.acquire()
+    except PoolTimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database unavailable",
+        )
+
+    # Models commit their own writes; anything left open when the request
+    # ends is rolled back as the connection goes back to the pool.
+    try:
+        yield con
+    finally:
+        pool.release(con)
+
+
+T = TypeVar("T")
+
+# Blocking psycopg2 calls run on this executor so that a slow query only
+# holds up the request that issued it. It is bounded by the pool size since
+# a worker can never do useful work without a connection.
+_executor: ThreadPoolExecutor | None = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=db_config["pool-max-size"], thread_name_prefix="db"
+        )
+
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), fn, *args)
+
+
+def _execute(
+    con: psycopg2.extensions.connection,
+    query: str,
+    params: tuple | list | dict | None,
+    fetch: str | None,
+):
+    cursor = con.cursor()
+
+    try:
+        cursor.execute(query, params)
+
+        if fetch == "one":
+            return cursor.fetchone()
+        if fetch == "all":
+            return cursor.fetchall()
+        return None
+    finally:
+        cursor.close()
+
+
+async def fetchone(
+    con: psycopg2.extensions.connection,
+    query: str,
+    params: tuple | list | dict | None = None,
+) -> tuple | None:
+    return await run_blocking(_execute, con, query, params, "one")
+
+
+async def fetchall(
+    con: psycopg2.extensions.connection,
+    query: str,
+    params: tuple | list | dict | None = None,
+) -> list[tuple]:
+    return await run_blocking(_execute, con, query, params, "all")
+
+
+async def execute(
+    con: psycopg2.extensions.connection,
+    query: str,
+    params: tuple | list | dict | None = None,
+) -> None:
+    await run_blocking(_execute, con, query, params, None)
+
+
+async def commit(con: psycopg2.extensions.connection) -> None:
+    await run_blocking(con.commit)
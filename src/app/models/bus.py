@@ -2,6 +2,23 @@ from app.models.globals import Location
 from datetime import datetime, time
 from typing import Union, List
 from psycopg2.extensions import connection
+from app.db import commit, execute, fetchall, fetchone
+from app.utils import identity_map
+
+
+# Bumped by every write to the bus tables, so that the in-memory timetable
+# knows to rebuild itself.
+_generation = 0
+
+
+def bus_data_generation() -> int:
+    return _generation
+
+
+def _bus_data_changed() -> None:
+    global _generation
+
+    _generation += 1
 
 
 class BusType:
@@ -13,67 +30,79 @@ class BusType:
         return f"BusType(name={self.name})"
 
 
-async def get_bus_types(con: connection) -> List[BusType]:
-    cursor = con.cursor()
+def build_bus_type(row: tuple) -> BusType:
+    return BusType(id=row[0], name=row[1])
 
-    cursor.execute("SELECT * FROM bus_types")
-    result = cursor.fetchall()
 
-    cursor.close()
-
-    types = [BusType(id=type[0], name=type[1]) for type in result]
-
-    return types
+def bus_type_from_row(row: tuple) -> BusType:
+    return identity_map.get_or_build(BusType, row[0], lambda: build_bus_type(row))
 
 
 async def get_bus_type_by_id(con: connection, id: int) -> Union[BusType, None]:
-    cursor = con.cursor()
-
-    cursor.execute("SELECT * FROM bus_types WHERE id=%s", (id,))
-    result = cursor.fetchone()
+    type = identity_map.lookup(BusType, id)
+    if type is not None:
+        return type
 
-    cursor.close()
+    result = await fetchone(con, "SELECT * FROM bus_types WHERE id=%s", (id,))
 
     if result is None:
         return None
 
-    return BusType(id=result[0], name=result[1])
+    return bus_type_from_row(result)
 
 
-async def create_bus_type(con: connection, name: str) -> Union[BusType, None]:
-    cursor = con.cursor()
+async def get_bus_types_by_ids(con: connection, ids: List[int]) -> dict[int, BusType]:
+    types: dict[int, BusType] = {}
+    missing = []
+    for id in set(ids):
+        type = identity_map.lookup(BusType, id)
+        if type is not None:
+            types[id] = type
+        else:
+            missing.append(id)
+
+    if len(missing) == 0:
+        return types
+
+    result = await fetchall(
+        con, "SELECT * FROM bus_types WHERE id = ANY(%s)", (missing,)
+    )
+
+    for row in result:
+        types[row[0]] = bus_type_from_row(row)
+
+    return types
 
-    cursor.execute("SELECT * FROM bus_types WHERE name=%s", (name,))
-    result = cursor.fetchone()
+
+async def create_bus_type(con: connection, name: str) -> Union[BusType, None]:
+    result = await fetchone(con, "SELECT * FROM bus_types WHERE name=%s", (name,))
     if result is not None:
-        cursor.close()
         return None
 
-    cursor.execute("INSERT INTO bus_types (name) VALUES (%s) RETURNING id", (name,))
-
-    id: int = cursor.fetchone()[0]
+    result = await fetchone(
+        con, "INSERT INTO bus_types (name) VALUES (%s) RETURNING id", (name,)
+    )
 
-    cursor.close()
+    id: int = result[0]
+    await commit(con)
+    _bus_data_changed()
 
     return BusType(id, name)
 
 
 async def update_bus_type(con: connection, type: BusType) -> BusType:
-    cursor = con.cursor()
-
-    cursor.execute("UPDATE bus_types SET name=%s WHERE id=%s", (type.name, type.id))
-
-    cursor.close()
+    await execute(con, "UPDATE bus_types SET name=%s WHERE id=%s", (type.name, type.id))
+    await commit(con)
+    _bus_data_changed()
 
     return type
 
 
 async def remove_bus_type(con: connection, type: BusType) -> None:
-    cursor = con.cursor()
-
-    cursor.execute("DELETE FROM bus_types WHERE id=%s", (type.id,))
-
-    cursor.close()
+    await execute(con, "DELETE FROM bus_types WHERE id=%s", (type.id,))
+    await commit(con)
+    _bus_data_changed()
+    identity_map.forget(BusType, type.id)
 
 
 class BusStop:
@@ -93,54 +122,57 @@ class BusStop:
         return f"BusStop(id={self.id}, name={self.name}, location={self.location}, landmark={self.landmark})"
 
 
-async def get_bus_stops(con: connection) -> List[BusStop]:
-    cursor = con.cursor()
-
-    cursor.execute("SELECT * FROM bus_stops")
-    result = cursor.fetchall()
-
-    cursor.close()
+def build_bus_stop(row: tuple) -> BusStop:
+    return BusStop(
+        id=row[0],
+        name=row[1],
+        location=(
+            Location(row[2], row[3])
+            if (row[2] is not None) and (row[3] is not None)
+            else None
+        ),
+        landmark=row[4],
+    )
 
-    stops = [
-        BusStop(
-            id=stop[0],
-            name=stop[1],
-            location=(
-                Location(stop[2], stop[3])
-                if (stop[2] is not None) and (stop[3] is not None)
-                else None
-            ),
-            landmark=stop[4],
-        )
-        for stop in result
-    ]
 
-    return stops
+def bus_stop_from_row(row: tuple) -> BusStop:
+    return identity_map.get_or_build(BusStop, row[0], lambda: build_bus_stop(row))
 
 
 async def get_bus_stop_by_id(con: connection, id: int) -> Union[BusStop, None]:
-    cursor = con.cursor()
-
-    cursor.execute("SELECT * FROM bus_stops WHERE id=%s", (id,))
-    result = cursor.fetchone()
+    stop = identity_map.lookup(BusStop, id)
+    if stop is not None:
+        return stop
 
-    cursor.close()
+    result = await fetchone(con, "SELECT * FROM bus_stops WHERE id=%s", (id,))
 
     if result is None:
         return None
 
-    stop = BusStop(
-        id=result[0],
-        name=result[1],
-        location=(
-            Location(result[2], result[3])
-            if (result[2] is not None) and (result[3] is not None)
-            else None
-        ),
-        landmark=result[4],
+    return bus_stop_from_row(result)
+
+
+async def get_bus_stops_by_ids(con: connection, ids: List[int]) -> dict[int, BusStop]:
+    stops: dict[int, BusStop] = {}
+    missing = []
+    for id in set(ids):
+        stop = identity_map.lookup(BusStop, id)
+        if stop is not None:
+            stops[id] = stop
+        else:
+            missing.append(id)
+
+    if len(missing) == 0:
+        return stops
+
+    result = await fetchall(
+        con, "SELECT * FROM bus_stops WHERE id = ANY(%s)", (missing,)
     )
 
-    return stop
+    for row in result:
+        stops[row[0]] = bus_stop_from_row(row)
+
+    return stops
 
 
 async def create_bus_stop(
@@ -149,15 +181,12 @@ async def create_bus_stop(
     location: Union[Location, None] = None,
     landmark: Union[str, None] = None,
 ) -> Union[BusStop, None]:
-    cursor = con.cursor()
-
-    cursor.execute("SELECT * FROM bus_stops WHERE name=%s", (name,))
-    result = cursor.fetchone()
+    result = await fetchone(con, "SELECT * FROM bus_stops WHERE name=%s", (name,))
     if result is not None:
-        cursor.close()
         return None
 
-    cursor.execute(
+    result = await fetchone(
+        con,
         "INSERT INTO bus_stops (name, latitude, longitude, landmark) VALUES (%s, %s, %s, %s) RETURNING id",
         (
             name,
@@ -167,17 +196,16 @@ async def create_bus_stop(
         ),
     )
 
-    id: int = cursor.fetchone()[0]
-
-    cursor.close()
+    id: int = result[0]
+    await commit(con)
+    _bus_data_changed()
 
     return BusStop(id, name, location, landmark)
 
 
 async def update_bus_stop(con: connection, stop: BusStop) -> BusStop:
-    cursor = con.cursor()
-
-    cursor.execute(
+    await execute(
+        con,
         "UPDATE bus_stops SET name=%s, latitude=%s, longitude=%s, landmark=%s WHERE id=%s",
         (
             stop.name,
@@ -187,18 +215,17 @@ async def update_bus_stop(con: connection, stop: BusStop) -> BusStop:
             stop.id,
         ),
     )
-
-    cursor.close()
+    await commit(con)
+    _bus_data_changed()
 
     return stop
 
 
 async def remove_bus_stop(con: connection, stop: BusStop) -> None:
-    cursor = con.cursor()
-
-    cursor.execute("DELETE FROM bus_stops WHERE id=%s", (stop.id,))
-
-    cursor.close()
+    await execute(con, "DELETE FROM bus_stops WHERE id=%s", (stop.id,))
+    await commit(con)
+    _bus_data_changed()
+    identity_map.forget(BusStop, stop.id)
 
 
 class BusRoute:
@@ -217,48 +244,67 @@ class BusRoute:
         self.via_stops = via_stops
 
 
-async def get_bus_routes(con: connection) -> List[BusRoute]:
-    cursor = con.cursor()
+def build_bus_route(row: tuple, stops: dict[int, BusStop]) -> BusRoute:
+    return BusRoute(
+        id=row[0],
+        name=row[1],
+        from_stop=stops.get(row[2]),
+        to_stop=stops.get(row[3]),
+        via_stops=[stops.get(stop_id) for stop_id in row[4]],
+    )
 
-    cursor.execute("SELECT * FROM bus_routes")
-    result = cursor.fetchall()
 
-    cursor.close()
+async def bus_routes_from_rows(con: connection, rows: List[tuple]) -> List[BusRoute]:
+    """
+    Builds routes from `bus_routes` rows, loading every stop they reference in
+    one query.
+    """
+    stop_ids = set()
+    for row in rows:
+        stop_ids.update([row[2], row[3], *row[4]])
 
-    routes = [
-        BusRoute(
-            id=route[0],
-            name=route[1],
-            from_stop=await get_bus_stop_by_id(con, route[2]),
-            to_stop=await get_bus_stop_by_id(con, route[3]),
-            via_stops=[await get_bus_stop_by_id(con, stop_id) for stop_id in route[4]],
-        )
-        for route in result
-    ]
+    stops = await get_bus_stops_by_ids(con, list(stop_ids))
 
-    return routes
+    return [
+        identity_map.get_or_build(BusRoute, row[0], lambda: build_bus_route(row, stops))
+        for row in rows
+    ]
 
 
 async def get_bus_route_by_id(con: connection, id: int) -> Union[BusRoute, None]:
-    cursor = con.cursor()
+    route = identity_map.lookup(BusRoute, id)
+    if route is not None:
+        return route
 
-    cursor.execute("SELECT * FROM bus_routes WHERE id=%s", (id,))
-    result = cursor.fetchone()
-
-    cursor.close()
+    result = await fetchone(con, "SELECT * FROM bus_routes WHERE id=%s", (id,))
 
     if result is None:
         return None
 
-    route = BusRoute(
-        id=result[0],
-        name=result[1],
-        from_stop=await get_bus_stop_by_id(con, result[2]),
-        to_stop=await get_bus_stop_by_id(con, result[3]),
-        via_stops=[await get_bus_stop_by_id(con, stop_id) for stop_id in result[4]],
+    return (await bus_routes_from_rows(con, [result]))[0]
+
+
+async def get_bus_routes_by_ids(con: connection, ids: List[int]) -> dict[int, BusRoute]:
+    routes: dict[int, BusRoute] = {}
+    missing = []
+    for id in set(ids):
+        route = identity_map.lookup(BusRoute, id)
+        if route is not None:
+            routes[id] = route
+        else:
+            missing.append(id)
+
+    if len(missing) == 0:
+        return routes
+
+    result = await fetchall(
+        con, "SELECT * FROM bus_routes WHERE id = ANY(%s)", (missing,)
     )
 
-    return route
+    for route in await bus_routes_from_rows(con, result):
+        routes[route.id] = route
+
+    return routes
 
 
 async def create_bus_route(
@@ -268,30 +314,26 @@ async def create_bus_route(
     to_stop: BusStop,
     via_stops: List[BusStop],
 ) -> Union[BusRoute, None]:
-    cursor = con.cursor()
-
-    cursor.execute("SELECT * FROM bus_routes WHERE name=%s", (name,))
-    result = cursor.fetchone()
+    result = await fetchone(con, "SELECT * FROM bus_routes WHERE name=%s", (name,))
     if result is not None:
-        cursor.close()
         return None
 
-    cursor.execute(
+    result = await fetchone(
+        con,
         "INSERT INTO bus_routes (name, from_stop, to_stop, via_stops) VALUES (%s, %s, %s, %s) RETURNING id",
         (name, from_stop.id, to_stop.id, [stop.id for stop in via_stops]),
     )
 
-    id: int = cursor.fetchone()[0]
-
-    cursor.close()
+    id: int = result[0]
+    await commit(con)
+    _bus_data_changed()
 
     return BusRoute(id, name, from_stop, to_stop, via_stops)
 
 
 async def update_bus_route(con: connection, route: BusRoute) -> BusRoute:
-    cursor = con.cursor()
-
-    cursor.execute(
+    await execute(
+        con,
         "UPDATE bus_routes SET name=%s, from_stop=%s, to_stop=%s, via_stops=%s WHERE id=%s",
         (
             route.name,
@@ -301,18 +343,17 @@ async def update_bus_route(con: connection, route: BusRoute) -> BusRoute:
             route.id,
         ),
     )
-
-    cursor.close()
+    await commit(con)
+    _bus_data_changed()
 
     return route
 
 
 async def remove_bus_route(con: connection, route: BusRoute) -> None:
-    cursor = con.cursor()
-
-    cursor.execute("DELETE FROM bus_routes WHERE id=%s", (route.id,))
-
-    cursor.close()
+    await execute(con, "DELETE FROM bus_routes WHERE id=%s", (route.id,))
+    await commit(con)
+    _bus_data_changed()
+    identity_map.forget(BusRoute, route.id)
 
 
 class BusScheduleItem:
@@ -333,59 +374,15 @@ class BusScheduleItem:
         self.via_stop_times = via_stop_times
 
 
-async def get_bus_schedules(con: connection) -> List[BusScheduleItem]:
-    cursor = con.cursor()
-
-    cursor.execute("SELECT * FROM bus_schedules")
-    result = cursor.fetchall()
-
-    cursor.close()
-
-    schedules = [
-        BusScheduleItem(
-            id=schedule[0],
-            start_time=schedule[1],
-            route=await get_bus_route_by_id(con, schedule[2]),
-            bus_type=await get_bus_type_by_id(con, schedule[3]),
-            end_time=schedule[4],
-            via_stop_times=(
-                [
-                    (
-                        datetime.strptime(time_str, "%H:%M:%S").time()
-                        if time_str is not None
-                        else None
-                    )
-                    for time_str in schedule[5]
-                ]
-                if schedule[5] is not None
-                else None
-            ),
-        )
-        for schedule in result
-    ]
-
-    return schedules
-
-
-async def get_bus_schedule_by_id(
-    con: connection, id: int
-) -> Union[BusScheduleItem, None]:
-    cursor = con.cursor()
-
-    cursor.execute("SELECT * FROM bus_schedules WHERE id=%s", (id,))
-    result = cursor.fetchone()
-
-    cursor.close()
-
-    if result is None:
-        return None
-
-    schedule = BusScheduleItem(
-        id=result[0],
-        start_time=result[1],
-        route=await get_bus_route_by_id(con, result[2]),
-        bus_type=await get_bus_type_by_id(con, result[3]),
-        end_time=result[4],
+def build_bus_schedule(
+    row: tuple, routes: dict[int, BusRoute], types: dict[int, BusType]
+) -> BusScheduleItem:
+    return BusScheduleItem(
+        id=row[0],
+        start_time=row[1],
+        route=routes.get(row[2]),
+        bus_type=types.get(row[3]),
+        end_time=row[4],
         via_stop_times=(
             [
                 (
@@ -393,14 +390,36 @@ async def get_bus_schedule_by_id(
                     if time_str is not None
                     else None
                 )
-                for time_str in result[5]
+                for time_str in row[5]
             ]
-            if result[5] is not None
+            if row[5] is not None
             else None
         ),
     )
 
-    return schedule
+
+async def bus_schedules_from_rows(
+    con: connection, rows: List[tuple]
+) -> List[BusScheduleItem]:
+    """
+    Builds schedules from `bus_schedules` rows. The routes, their stops and the
+    bus types are each loaded in one query and shared between schedules.
+    """
+    routes = await get_bus_routes_by_ids(con, [row[2] for row in rows])
+    types = await get_bus_types_by_ids(con, [row[3] for row in rows])
+
+    return [build_bus_schedule(row, routes, types) for row in rows]
+
+
+async def get_bus_schedule_by_id(
+    con: connection, id: int
+) -> Union[BusScheduleItem, None]:
+    result = await fetchone(con, "SELECT * FROM bus_schedules WHERE id=%s", (id,))
+
+    if result is None:
+        return None
+
+    return (await bus_schedules_from_rows(con, [result]))[0]
 
 
 async def create_bus_schedule(
@@ -411,18 +430,16 @@ async def create_bus_schedule(
     end_time: Union[time, None] = None,
     via_stop_times: Union[List[Union[time, None]], None] = None,
 ) -> Union[BusScheduleItem, None]:
-    cursor = con.cursor()
-
-    cursor.execute(
+    result = await fetchone(
+        con,
         "SELECT * FROM bus_schedules WHERE start_time=%s AND route=%s AND bus_type=%s",
         (start_time, route.id, bus_type.id),
     )
-    result = cursor.fetchone()
     if result is not None:
-        cursor.close()
         return None
 
-    cursor.execute(
+    result = await fetchone(
+        con,
         "INSERT INTO bus_schedules (start_time, route, bus_type, end_time, via_stop_times) VALUES (%s, %s, %s, %s, %s) RETURNING id",
         (
             start_time,
@@ -440,9 +457,9 @@ async def create_bus_schedule(
         ),
     )
 
-    id: int = cursor.fetchone()[0]
-
-    cursor.close()
+    id: int = result[0]
+    await commit(con)
+    _bus_data_changed()
 
     return BusScheduleItem(id, start_time, route, bus_type, end_time, via_stop_times)
 
@@ -450,9 +467,8 @@ async def create_bus_schedule(
 async def update_bus_schedule(
     con: connection, schedule: BusScheduleItem
 ) -> BusScheduleItem:
-    cursor = con.cursor()
-
-    cursor.execute(
+    await execute(
+        con,
         "UPDATE bus_schedules SET start_time=%s, route=%s, bus_type=%s, end_time=%s, via_stop_times=%s WHERE id=%s",
         (
             schedule.start_time,
@@ -470,15 +486,13 @@ async def update_bus_schedule(
             schedule.id,
         ),
     )
-
-    cursor.close()
+    await commit(con)
+    _bus_data_changed()
 
     return schedule
 
 
 async def remove_bus_schedule(con: connection, schedule: BusScheduleItem) -> None:
-    cursor = con.cursor()
-
-    cursor.execute("DELETE FROM bus_schedules WHERE id=%s", (schedule.id,))
-
-    cursor.close()
+    await execute(con, "DELETE FROM bus_schedules WHERE id=%s", (schedule.id,))
+    await commit(con)
+    _bus_data_changed()
@@ -0,0 +1,162 @@
+from array import array
+from bisect import bisect_left
+from typing import Iterable, List, Tuple
+
+MINUTES_PER_DAY = 24 * 60
+
+
+class JourneyLeg:
+    def __init__(
+        self,
+        schedule_id: int,
+        from_stop: int,
+        to_stop: int,
+        departure: int,
+        arrival: int,
+    ) -> None:
+        self.schedule_id = schedule_id
+        self.from_stop = from_stop
+        self.to_stop = to_stop
+        # Minutes since midnight of the day the search starts on, so they may
+        # run past MINUTES_PER_DAY.
+        self.departure = departure
+        self.arrival = arrival
+
+
+class ConnectionScan:
+    """
+    Earliest-arrival journey planning with the connection scan algorithm.
+
+    Every trip is cut into elementary connections, one per pair of consecutive
+    stops, and the connections are kept in arrays sorted by departure. A query
+    is a single pass over them from the requested time, stopping as soon as
+    no later connection can improve the arrival at the destination.
+
+    Trips run every day, so the connections are laid out for two consecutive
+    days; a search late in the evening can then continue into the next
+    morning. The after-midnight part of trips that left the evening before
+    is added once more, shifted back a day, so that it can be boarded by an
+    early morning search.
+    """
+
+    def __init__(self, trips: Iterable[Tuple[int, List[Tuple[int, int]]]]) -> None:
+        """
+        `trips` holds (schedule id, [(stop id, minute of day), ...]) with the
+        stops in the order the trip visits them.
+        """
+        connections: List[Tuple[int, int, int, int, int]] = []
+        schedule_ids: List[int] = []
+
+        for schedule_id, stops in trips:
+            trip = len(schedule_ids)
+            schedule_ids.append(schedule_id)
+
+            # A stop time earlier than the previous one means the trip has
+            # crossed midnight.
+            previous: Tuple[int, int] | None = None
+            day = 0
+            for stop, minute in stops:
+                time = minute + day
+                if previous is not None and time < previous[1]:
+                    day += MINUTES_PER_DAY
+                    time += MINUTES_PER_DAY
+
+                if previous is not None:
+                    for copy in range(-1, 2):
+                        shift = copy * MINUTES_PER_DAY
+                        if previous[1] + shift < 0:
+                            continue
+
+                        connections.append(
+                            (
+                                previous[1] + shift,
+                                time + shift,
+                                previous[0],
+                                stop,
+                                trip * 3 + copy + 1,
+                            )
+                        )
+
+                previous = (stop, time)
+
+        connections.sort()
+
+        self.schedule_ids = schedule_ids
+        self.departures = array("L", (c[0] for c in connections))
+        self.arrivals = array("L", (c[1] for c in connections))
+        self.from_stops = array("L", (c[2] for c in connections))
+        self.to_stops = array("L", (c[3] for c in connections))
+        self.trips = array("L", (c[4] for c in connections))
+
+    def __len__(self) -> int:
+        return len(self.departures)
+
+    def earliest_arrival(
+        self, from_stop: int, to_stop: int, depart_after: int
+    ) -> List[JourneyLeg] | None:
+        """
+        Returns the legs of a journey reaching `to_stop` as early as possible
+        when leaving `from_stop` at or after `depart_after` (minute of day), or
+        None if it cannot be reached within a day.
+        """
+        if from_stop == to_stop:
+            return []
+
+        departures = self.departures
+        arrivals = self.arrivals
+        from_stops = self.from_stops
+        to_stops = self.to_stops
+        trips = self.trips
+
+        earliest = {from_stop: depart_after}
+        # Connection index at which each trip was boarded, and for every stop
+        # the (boarding, alighting) connections of the best way to reach it.
+        boarded: dict[int, int] = {}
+        reached_by: dict[int, Tuple[int, int]] = {}
+        target = None
+        last_departure = depart_after + MINUTES_PER_DAY
+
+        for index in range(bisect_left(departures, depart_after), len(departures)):
+            departure = departures[index]
+            if departure > last_departure:
+                break
+            if target is not None and departure >= target:
+                break
+
+            trip = trips[index]
+            boarded_at = boarded.get(trip)
+            if boarded_at is None:
+                reached = earliest.get(from_stops[index])
+                if reached is None or reached > departure:
+                    continue
+                boarded_at = boarded[trip] = index
+
+            stop = to_stops[index]
+            arrival = arrivals[index]
+            best = earliest.get(stop)
+            if best is None or arrival < best:
+                earliest[stop] = arrival
+                reached_by[stop] = (boarded_at, index)
+                if stop == to_stop:
+                    target = arrival
+
+        if target is None:
+            return None
+
+        legs: List[JourneyLeg] = []
+        stop = to_stop
+        while stop != from_stop:
+            enter, exit = reached_by[stop]
+            legs.append(
+                JourneyLeg(
+                    schedule_id=self.schedule_ids[trips[enter] // 3],
+                    from_stop=from_stops[enter],
+                    to_stop=stop,
+                    departure=departures[enter],
+                    arrival=arrivals[exit],
+                )
+            )
+            stop = from_stops[enter]
+
+        legs.reverse()
+        return legs
@@ -0,0 +1,169 @@
+from app.db import fetchall
+from app.models.bus import (
+    BusRoute,
+    BusScheduleItem,
+    BusStop,
+    BusType,
+    build_bus_route,
+    build_bus_schedule,
+    build_bus_stop,
+    build_bus_type,
+    bus_data_generation,
+)
+from app.models.bus_journey import ConnectionScan
+from array import array
+from bisect import bisect_left
+from datetime import time
+from typing import List, Tuple
+from psycopg2.extensions import connection
+
+
+def minute_of_day(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def trip_stops(
+    schedule: BusScheduleItem, include_terminus: bool = False
+) -> List[Tuple[BusStop, time]]:
+    """
+    Returns the stops of a trip that have a known time, in route order: the
+    origin at `start_time`, then every via stop with a time in
+    `via_stop_times`, and with `include_terminus` the destination at
+    `end_time`.
+    """
+    route = schedule.route
+    if route is None:
+        return []
+
+    stops = []
+    if route.from_stop is not None:
+        stops.append((route.from_stop, schedule.start_time))
+
+    via_stop_times = schedule.via_stop_times or []
+    for stop, stop_time in zip(route.via_stops, via_stop_times):
+        if stop is not None and stop_time is not None:
+            stops.append((stop, stop_time))
+
+    if include_terminus and route.to_stop is not None and schedule.end_time is not None:
+        stops.append((route.to_stop, schedule.end_time))
+
+    return stops
+
+
+class DepartureIndex:
+    """
+    Departures sorted by minute of the day, stored as two parallel compact
+    arrays of minutes and schedule ids.
+    """
+
+    def __init__(self, departures: List[Tuple[int, int]]) -> None:
+        departures.sort()
+        self.minutes = array("H", (minute for minute, _ in departures))
+        self.schedule_ids = array("L", (id for _, id in departures))
+
+    def __len__(self) -> int:
+        return len(self.minutes)
+
+    def next(self, minute: int, limit: int) -> List[Tuple[int, int, bool]]:
+        """
+        Returns up to `limit` (minute, schedule id, next day) departures at or
+        after `minute`, continuing from the start of the next day once the
+        rest of today runs out.
+        """
+        start = bisect_left(self.minutes, minute)
+        departures = []
+        for offset in range(min(limit, len(self.minutes))):
+            index = start + offset
+            next_day = index >= len(self.minutes)
+            if next_day:
+                index -= len(self.minutes)
+
+            departures.append((self.minutes[index], self.schedule_ids[index], next_day))
+
+        return departures
+
+
+class BusTimetable:
+    """
+    An in-memory snapshot of the bus tables. Objects are built once and
+    shared, and departures are indexed per stop and per route.
+    """
+
+    def __init__(
+        self,
+        type_rows: List[tuple],
+        stop_rows: List[tuple],
+        route_rows: List[tuple],
+        schedule_rows: List[tuple],
+    ) -> None:
+        self.types: dict[int, BusType] = {
+            row[0]: build_bus_type(row) for row in type_rows
+        }
+        self.stops: dict[int, BusStop] = {
+            row[0]: build_bus_stop(row) for row in stop_rows
+        }
+        self.routes: dict[int, BusRoute] = {
+            row[0]: build_bus_route(row, self.stops) for row in route_rows
+        }
+        self.schedules: dict[int, BusScheduleItem] = {
+            row[0]: build_bus_schedule(row, self.routes, self.types)
+            for row in schedule_rows
+        }
+
+        by_stop: dict[int, List[Tuple[int, int]]] = {}
+        by_route: dict[int, List[Tuple[int, int]]] = {}
+        for schedule in self.schedules.values():
+            if schedule.route is None:
+                continue
+
+            by_route.setdefault(schedule.route.id, []).append(
+                (minute_of_day(schedule.start_time), schedule.id)
+            )
+            for stop, stop_time in trip_stops(schedule):
+                by_stop.setdefault(stop.id, []).append(
+                    (minute_of_day(stop_time), schedule.id)
+                )
+
+        self.stop_departures: dict[int, DepartureIndex] = {
+            id: DepartureIndex(departures) for id, departures in by_stop.items()
+        }
+        self.route_departures: dict[int, DepartureIndex] = {
+            id: DepartureIndex(departures) for id, departures in by_route.items()
+        }
+
+        self.connections = ConnectionScan(
+            (
+                schedule.id,
+                [
+                    (stop.id, minute_of_day(stop_time))
+                    for stop, stop_time in trip_stops(schedule, include_terminus=True)
+                ],
+            )
+            for schedule in self.schedules.values()
+        )
+
+
+# The timetable is rebuilt on the first read after any write to the bus tables
+# and replaced in a single assignment, so readers always see a complete
+# snapshot. It is stored together with the generation it was built from.
+_timetable: Tuple[int, BusTimetable] | None = None
+
+
+async def get_bus_timetable(con: connection) -> BusTimetable:
+    global _timetable
+
+    generation = bus_data_generation()
+    if _timetable is not None and _timetable[0] == generation:
+        return _timetable[1]
+
+    timetable = BusTimetable(
+        await fetchall(con, "SELECT * FROM bus_types ORDER BY id"),
+        await fetchall(con, "SELECT * FROM bus_stops ORDER BY id"),
+        await fetchall(con, "SELECT * FROM bus_routes ORDER BY id"),
+        await fetchall(con, "SELECT * FROM bus_schedules ORDER BY id"),
+    )
+
+    if generation == bus_data_generation():
+        _timetable = (generation, timetable)
+
+    return timetable
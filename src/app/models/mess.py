@@ -1,4 +1,7 @@
 import psycopg2.extensions
+from app.db import commit, execute, fetchall, fetchone
+from app.models.mess_timings import invalidate_meal_index
+from app.utils import identity_map
 from fastapi import HTTPException, status
 from app.utils._db import json_to_sql
 from app.models.globals import Location
@@ -25,21 +28,20 @@ class MessMenuItem:
         self.image = image
 
     async def sync_details(self, con: psycopg2.extensions.connection) -> None:
-        cursor = con.cursor()
-
         if self.id is not None:
-            cursor.execute(f"SELECT * FROM mess_menu_items WHERE id={self.id}")
+            result = await fetchone(
+                con, "SELECT * FROM mess_menu_items WHERE id=%s", (self.id,)
+            )
         elif self.name is not None:
-            cursor.execute("SELECT * FROM mess_menu_items WHERE name=%s", (self.name,))
+            result = await fetchone(
+                con, "SELECT * FROM mess_menu_items WHERE name=%s", (self.name,)
+            )
         else:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Insufficient data to fetch mess menu item details",
             )
 
-        result = cursor.fetchone()
-        cursor.close()
-
         try:
             self.id = result[0]
             self.name = result[1]
@@ -54,40 +56,98 @@ class MessMenuItem:
             )
 
     async def create(self, con: psycopg2.extensions.connection) -> None:
-        cursor = con.cursor()
-
-        cursor.execute(
+        result = await fetchone(
+            con,
             "INSERT INTO mess_menu_items (name, description, rating, cal, image) VALUES (%s, %s, %s, %s, %s) RETURNING id",
             (self.name, self.description, self.rating, self.cal, self.image),
         )
 
-        con.commit()
+        await commit(con)
 
-        self.id = cursor.fetchone()[0]
-        cursor.close()
+        self.id = result[0]
 
         await self.sync_details(con)
 
     async def update(self, con: psycopg2.extensions.connection) -> None:
-        cursor = con.cursor()
-
-        cursor.execute(
+        await execute(
+            con,
             "UPDATE mess_menu_items SET name=%s, description=%s, rating=%s, cal=%s, image=%s WHERE id=%s",
             (self.name, self.description, self.rating, self.cal, self.image, self.id),
         )
-        con.commit()
-
-        cursor.close()
+        await commit(con)
 
         await self.sync_details(con)
 
     async def remove(self, con: psycopg2.extensions.connection) -> None:
-        cursor = con.cursor()
+        await execute(con, "DELETE FROM mess_menu_items WHERE id=%s", (self.id,))
+        await commit(con)
+        identity_map.forget(MessMenuItem, self.id)
+
+
+def mess_menu_item_from_row(row: tuple) -> MessMenuItem:
+    return identity_map.get_or_build(
+        MessMenuItem,
+        row[0],
+        lambda: MessMenuItem(
+            id=row[0],
+            name=row[1],
+            description=row[2],
+            rating=row[3],
+            cal=row[4],
+            image=row[5],
+        ),
+    )
+
+
+async def get_mess_menu_items_by_ids(
+    con: psycopg2.extensions.connection, ids: list[int]
+) -> dict[int, MessMenuItem]:
+    items: dict[int, MessMenuItem] = {}
+    missing = []
+    for id in set(ids):
+        item = identity_map.lookup(MessMenuItem, id)
+        if item is not None:
+            items[id] = item
+        else:
+            missing.append(id)
+
+    if len(missing) == 0:
+        return items
+
+    result = await fetchall(
+        con, "SELECT * FROM mess_menu_items WHERE id = ANY(%s)", (missing,)
+    )
 
-        cursor.execute(f"DELETE FROM mess_menu_items WHERE id={self.id}")
-        con.commit()
+    for row in result:
+        items[row[0]] = mess_menu_item_from_row(row)
 
-        cursor.close()
+    return items
+
+
+async def get_mess_menu_items_strict(
+    con: psycopg2.extensions.connection, ids: list[int]
+) -> dict[int, MessMenuItem]:
+    """
+    Like `get_mess_menu_items_by_ids`, but fails with a single 404 naming every
+    id that does not exist.
+    """
+    items = await get_mess_menu_items_by_ids(con, ids)
+
+    missing = sorted(set(ids) - items.keys())
+    if len(missing) > 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Mess menu items not found: {', '.join(str(id) for id in missing)}",
+        )
+
+    return items
+
+
+DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MEALS = ["breakfast", "lunch", "snacks", "dinner"]
+SLOTS = [(day, meal) for day in DAYS for meal in MEALS]
+
+MESS_MENU_ITEM_COLUMNS = "i.id, i.name, i.description, i.rating, i.cal, i.image"
 
 
 class DayMenu(TypedDict):
@@ -122,14 +182,24 @@ class MessMenu:
         self.saturday = saturday
         self.sunday = sunday
 
-    async def sync_details(self, con: psycopg2.extensions.connection) -> None:
-        cursor = con.cursor()
-
+    async def sync_details(
+        self,
+        con: psycopg2.extensions.connection,
+        day: str | None = None,
+        meal: str | None = None,
+    ) -> None:
+        """
+        Loads the menu. When `day` and/or `meal` are given only those slots are
+        fetched, and every other slot is left as None.
+        """
         if self.id is not None:
-            cursor.execute(f"SELECT * FROM mess_menus WHERE id={self.id}")
+            result = await fetchone(
+                con, "SELECT id, month, year FROM mess_menus WHERE id=%s", (self.id,)
+            )
         elif self.month is not None and self.year is not None:
-            cursor.execute(
-                "SELECT * FROM mess_menus WHERE month=%s AND year=%s",
+            result = await fetchone(
+                con,
+                "SELECT id, month, year FROM mess_menus WHERE month=%s AND year=%s",
                 (self.month, self.year),
             )
         else:
@@ -138,312 +208,269 @@ class MessMenu:
                 detail="Insufficient data to fetch mess menu details",
             )
 
-        result = cursor.fetchone()
-        cursor.close()
-
-        try:
-            self.id = result[0]
-            self.month = result[1]
-            self.year = result[2]
-
-            monday_breakfast: list[int] | None = result[3]
-            monday_lunch: list[int] | None = result[4]
-            monday_snacks: list[int] | None = result[5]
-            monday_dinner: list[int] | None = result[6]
-
-            self.monday = {
-                "breakfast": [MessMenuItem(id=item_id) for item_id in monday_breakfast]
-                if monday_breakfast is not None
-                else None,
-                "lunch": [MessMenuItem(id=item_id) for item_id in monday_lunch]
-                if monday_lunch is not None
-                else None,
-                "snacks": [MessMenuItem(id=item_id) for item_id in monday_snacks]
-                if monday_snacks is not None
-                else None,
-                "dinner": [MessMenuItem(id=item_id) for item_id in monday_dinner]
-                if monday_dinner is not None
-                else None,
-            }
-
-            tuesday_breakfast: list[int] | None = result[7]
-            tuesday_lunch: list[int] | None = result[8]
-            tuesday_snacks: list[int] | None = result[9]
-            tuesday_dinner: list[int] | None = result[10]
-
-            self.tuesday = {
-                "breakfast": [MessMenuItem(id=item_id) for item_id in tuesday_breakfast]
-                if tuesday_breakfast is not None
-                else None,
-                "lunch": [MessMenuItem(id=item_id) for item_id in tuesday_lunch]
-                if tuesday_lunch is not None
-                else None,
-                "snacks": [MessMenuItem(id=item_id) for item_id in tuesday_snacks]
-                if tuesday_snacks is not None
-                else None,
-                "dinner": [MessMenuItem(id=item_id) for item_id in tuesday_dinner]
-                if tuesday_dinner is not None
-                else None,
-            }
-
-            wednesday_breakfast: list[int] | None = result[11]
-            wednesday_lunch: list[int] | None = result[12]
-            wednesday_snacks: list[int] | None = result[13]
-            wednesday_dinner: list[int] | None = result[14]
-
-            self.wednesday = {
-                "breakfast": [
-                    MessMenuItem(id=item_id) for item_id in wednesday_breakfast
-                ]
-                if wednesday_breakfast is not None
-                else None,
-                "lunch": [MessMenuItem(id=item_id) for item_id in wednesday_lunch]
-                if wednesday_lunch is not None
-                else None,
-                "snacks": [MessMenuItem(id=item_id) for item_id in wednesday_snacks]
-                if wednesday_snacks is not None
-                else None,
-                "dinner": [MessMenuItem(id=item_id) for item_id in wednesday_dinner]
-                if wednesday_dinner is not None
-                else None,
-            }
-
-            thursday_breakfast: list[int] | None = result[15]
-            thursday_lunch: list[int] | None = result[16]
-            thursday_snacks: list[int] | None = result[17]
-            thursday_dinner: list[int] | None = result[18]
+        if result is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Mess menu not found",
+            )
 
-            self.thursday = {
-                "breakfast": [
-                    MessMenuItem(id=item_id) for item_id in thursday_breakfast
-                ]
-                if thursday_breakfast is not None
-                else None,
-                "lunch": [MessMenuItem(id=item_id) for item_id in thursday_lunch]
-                if thursday_lunch is not None
-                else None,
-                "snacks": [MessMenuItem(id=item_id) for item_id in thursday_snacks]
-                if thursday_snacks is not None
-                else None,
-                "dinner": [MessMenuItem(id=item_id) for item_id in thursday_dinner]
-                if thursday_dinner is not None
-                else None,
-            }
+        self.id = result[0]
+        self.month = result[1]
+        self.year = result[2]
 
-            friday_breakfast: list[int] | None = result[19]
-            friday_lunch: list[int] | None = result[20]
-            friday_snacks: list[int] | None = result[21]
-            friday_dinner: list[int] | None = result[22]
+        await self._sync_entries(con, day, meal)
 
-            self.friday = {
-                "breakfast": [MessMenuItem(id=item_id) for item_id in friday_breakfast]
-                if friday_breakfast is not None
-                else None,
-                "lunch": [MessMenuItem(id=item_id) for item_id in friday_lunch]
-                if friday_lunch is not None
-                else None,
-                "snacks": [MessMenuItem(id=item_id) for item_id in friday_snacks]
-                if friday_snacks is not None
-                else None,
-                "dinner": [MessMenuItem(id=item_id) for item_id in friday_dinner]
-                if friday_dinner is not None
-                else None,
-            }
-
-            saturday_breakfast: list[int] | None = result[23]
-            saturday_lunch: list[int] | None = result[24]
-            saturday_snacks: list[int] | None = result[25]
-            saturday_dinner: list[int] | None = result[26]
+    async def _sync_entries(
+        self,
+        con: psycopg2.extensions.connection,
+        day: str | None = None,
+        meal: str | None = None,
+    ) -> None:
+        self._fill_entries(
+            await self._fetch_entries(con, day, meal),
+            days=[day] if day is not None else DAYS,
+            meals=[meal] if meal is not None else MEALS,
+        )
 
-            self.saturday = {
-                "breakfast": [
-                    MessMenuItem(id=item_id) for item_id in saturday_breakfast
-                ]
-                if saturday_breakfast is not None
-                else None,
-                "lunch": [MessMenuItem(id=item_id) for item_id in saturday_lunch]
-                if saturday_lunch is not None
-                else None,
-                "snacks": [MessMenuItem(id=item_id) for item_id in saturday_snacks]
-                if saturday_snacks is not None
-                else None,
-                "dinner": [MessMenuItem(id=item_id) for item_id in saturday_dinner]
-                if saturday_dinner is not None
-                else None,
-            }
+    async def _fetch_entries(
+        self,
+        con: psycopg2.extensions.connection,
+        day: str | None = None,
+        meal: str | None = None,
+    ) -> list[tuple[str, str, MessMenuItem]]:
+        query = f"SELECT e.day, e.meal, {MESS_MENU_ITEM_COLUMNS} FROM mess_menu_entries e JOIN mess_menu_items i ON i.id = e.item_id WHERE e.menu_id=%s"
+        params = [self.id]
+
+        if day is not None:
+            query += " AND e.day=%s"
+            params.append(day)
+        if meal is not None:
+            query += " AND e.meal=%s"
+            params.append(meal)
+
+        result = await fetchall(
+            con, query + " ORDER BY e.day, e.meal, e.position", tuple(params)
+        )
 
-            sunday_breakfast: list[int] | None = result[27]
-            sunday_lunch: list[int] | None = result[28]
-            sunday_snacks: list[int] | None = result[29]
-            sunday_dinner: list[int] | None = result[30]
+        return [(row[0], row[1], mess_menu_item_from_row(row[2:])) for row in result]
 
-            self.sunday = {
-                "breakfast": [MessMenuItem(id=item_id) for item_id in sunday_breakfast]
-                if sunday_breakfast is not None
-                else None,
-                "lunch": [MessMenuItem(id=item_id) for item_id in sunday_lunch]
-                if sunday_lunch is not None
-                else None,
-                "snacks": [MessMenuItem(id=item_id) for item_id in sunday_snacks]
-                if sunday_snacks is not None
-                else None,
-                "dinner": [MessMenuItem(id=item_id) for item_id in sunday_dinner]
-                if sunday_dinner is not None
+    def _fill_entries(
+        self,
+        entries: list[tuple[str, str, MessMenuItem]],
+        days: list[str] = DAYS,
+        meals: list[str] = MEALS,
+    ) -> None:
+        # Entries are expected in position order within each slot. Slots outside
+        # `days` x `meals` were not loaded and are left as None.
+        for day in DAYS:
+            setattr(
+                self,
+                day,
+                {meal: [] if meal in meals else None for meal in MEALS}
+                if day in days
                 else None,
-            }
-
-            if self.monday["breakfast"] is not None:
-                for item in self.monday["breakfast"]:
-                    await item.sync_details(con)
-
-            if self.monday["lunch"] is not None:
-                for item in self.monday["lunch"]:
-                    await item.sync_details(con)
-
-            if self.monday["snacks"] is not None:
-                for item in self.monday["snacks"]:
-                    await item.sync_details(con)
-
-            if self.monday["dinner"] is not None:
-                for item in self.monday["dinner"]:
-                    await item.sync_details(con)
-
-            if self.tuesday["breakfast"] is not None:
-                for item in self.tuesday["breakfast"]:
-                    await item.sync_details(con)
-
-            if self.tuesday["lunch"] is not None:
-                for item in self.tuesday["lunch"]:
-                    await item.sync_details(con)
-
-            if self.tuesday["snacks"] is not None:
-                for item in self.tuesday["snacks"]:
-                    await item.sync_details(con)
-
-            if self.tuesday["dinner"] is not None:
-                for item in self.tuesday["dinner"]:
-                    await item.sync_details(con)
-
-            if self.wednesday["breakfast"] is not None:
-                for item in self.wednesday["breakfast"]:
-                    await item.sync_details(con)
-
-            if self.wednesday["lunch"] is not None:
-                for item in self.wednesday["lunch"]:
-                    await item.sync_details(con)
-
-            if self.wednesday["snacks"] is not None:
-                for item in self.wednesday["snacks"]:
-                    await item.sync_details(con)
-
-            if self.wednesday["dinner"] is not None:
-                for item in self.wednesday["dinner"]:
-                    await item.sync_details(con)
-
-            if self.thursday["breakfast"] is not None:
-                for item in self.thursday["breakfast"]:
-                    await item.sync_details(con)
-
-            if self.thursday["lunch"] is not None:
-                for item in self.thursday["lunch"]:
-                    await item.sync_details(con)
-
-            if self.thursday["snacks"] is not None:
-                for item in self.thursday["snacks"]:
-                    await item.sync_details(con)
-
-            if self.thursday["dinner"] is not None:
-                for item in self.thursday["dinner"]:
-                    await item.sync_details(con)
-
-            if self.friday["breakfast"] is not None:
-                for item in self.friday["breakfast"]:
-                    await item.sync_details(con)
-
-            if self.friday["lunch"] is not None:
-                for item in self.friday["lunch"]:
-                    await item.sync_details(con)
-
-            if self.friday["snacks"] is not None:
-                for item in self.friday["snacks"]:
-                    await item.sync_details(con)
-
-            if self.friday["dinner"] is not None:
-                for item in self.friday["dinner"]:
-                    await item.sync_details(con)
-
-            if self.saturday["breakfast"] is not None:
-                for item in self.saturday["breakfast"]:
-                    await item.sync_details(con)
-
-            if self.saturday["lunch"] is not None:
-                for item in self.saturday["lunch"]:
-                    await item.sync_details(con)
-
-            if self.saturday["snacks"] is not None:
-                for item in self.saturday["snacks"]:
-                    await item.sync_details(con)
-
-            if self.saturday["dinner"] is not None:
-                for item in self.saturday["dinner"]:
-                    await item.sync_details(con)
-
-            if self.sunday["breakfast"] is not None:
-                for item in self.sunday["breakfast"]:
-                    await item.sync_details(con)
+            )
 
-            if self.sunday["lunch"] is not None:
-                for item in self.sunday["lunch"]:
-                    await item.sync_details(con)
+        for day, meal, item in entries:
+            getattr(self, day)[meal].append(item)
+
+    def set_slot(self, day: str, meal: str, items: list[MessMenuItem]) -> None:
+        if getattr(self, day) is None:
+            setattr(self, day, {slot: None for slot in MEALS})
+        getattr(self, day)[meal] = items
+
+    def _fill_empty_slots(self) -> None:
+        # Mirrors what a fresh read would return for slots with no entries.
+        for day in DAYS:
+            if getattr(self, day) is None:
+                setattr(self, day, {meal: [] for meal in MEALS})
+            for meal in MEALS:
+                if getattr(self, day)[meal] is None:
+                    getattr(self, day)[meal] = []
+
+    async def _replace_slots(
+        self, con: psycopg2.extensions.connection, slots: list[tuple[str, str]]
+    ) -> None:
+        await execute(
+            con,
+            "DELETE FROM mess_menu_entries WHERE menu_id=%s AND (day, meal) IN (SELECT * FROM unnest(%s::text[], %s::text[]))",
+            (self.id, [day for day, _ in slots], [meal for _, meal in slots]),
+        )
 
-            if self.sunday["snacks"] is not None:
-                for item in self.sunday["snacks"]:
-                    await item.sync_details(con)
+        await self._insert_slots(con, slots)
 
-            if self.sunday["dinner"] is not None:
-                for item in self.sunday["dinner"]:
-                    await item.sync_details(con)
-        except TypeError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Mess menu not found",
-            )
+    async def _insert_slots(
+        self, con: psycopg2.extensions.connection, slots: list[tuple[str, str]]
+    ) -> None:
+        days, meals, positions, item_ids = [], [], [], []
+        for day, meal in slots:
+            day_menu: DayMenu | None = getattr(self, day)
+            if day_menu is None or day_menu[meal] is None:
+                continue
+
+            for position, item in enumerate(day_menu[meal]):
+                days.append(day)
+                meals.append(meal)
+                positions.append(position)
+                item_ids.append(item.id if isinstance(item, MessMenuItem) else item)
+
+        if len(item_ids) == 0:
+            return
+
+        await execute(
+            con,
+            "INSERT INTO mess_menu_entries (menu_id, day, meal, position, item_id) SELECT %s, * FROM unnest(%s::text[], %s::text[], %s::int[], %s::int[])",
+            (self.id, days, meals, positions, item_ids),
+        )
 
     async def create(self, con: psycopg2.extensions.connection) -> None:
-        cursor = con.cursor()
-
-        cursor.execute(
-            f"""INSERT INTO mess_menus (month, year, monday_breakfast, monday_lunch, monday_snacks, monday_dinner, tuesday_breakfast, tuesday_lunch, tuesday_snacks, tuesday_dinner, wednesday_breakfast, wednesday_lunch, wednesday_snacks, wednesday_dinner, thursday_breakfast, thursday_lunch, thursday_snacks, thursday_dinner, friday_breakfast, friday_lunch, friday_snacks, friday_dinner, saturday_breakfast, saturday_lunch, saturday_snacks, saturday_dinner, sunday_breakfast, sunday_lunch, sunday_snacks, sunday_dinner) VALUES (%s, %s, '{[item.id for item in self.monday["breakfast"]] if self.monday is not None and self.monday["breakfast"] is not None else []}', '{[item.id for item in self.monday["lunch"]] if self.monday is not None and self.monday["lunch"] is not None else []}', '{[item.id for item in self.monday["snacks"]] if self.monday is not None and self.monday["snacks"] is not None else []}', '{[item.id for item in self.monday["dinner"]] if self.monday is not None and self.monday["dinner"] is not None else []}', '{[item.id for item in self.tuesday["breakfast"]] if self.tuesday is not None and self.tuesday["breakfast"] is not None else []}', '{[item.id for item in self.tuesday["lunch"]] if self.tuesday is not None and self.tuesday["lunch"] is not None else []}', '{[item.id for item in self.tuesday["snacks"]] if self.tuesday is not None and self.tuesday["snacks"] is not None else []}', '{[item.id for item in self.tuesday["dinner"]] if self.tuesday is not None and self.tuesday["dinner"] is not None else []}', '{[item.id for item in self.wednesday["breakfast"]] if self.wednesday is not None and self.wednesday["breakfast"] is not None else []}', '{[item.id for item in self.wednesday["lunch"]] if self.wednesday is not None and self.wednesday["lunch"] is not None else []}', '{[item.id for item in self.wednesday["snacks"]] if self.wednesday is not None and self.wednesday["snacks"] is not None else []}', '{[item.id for item in self.wednesday["dinner"]] if self.wednesday is not None and self.wednesday["dinner"] is not None else []}', '{[item.id for item in self.thursday["breakfast"]] if self.thursday is not None and self.thursday["breakfast"] is not None else []}', '{[item.id for item in self.thursday["lunch"]] if self.thursday is not None and self.thursday["lunch"] is not None else []}', '{[item.id for item in self.thursday["sncaks"]] if self.thursday is not None and self.thursday["sncaks"] is not None else []}', '{[item.id for item in self.thursday["dinner"]] if self.thursday is not None and self.thursday["dinner"] is not None else []}', '{[item.id for item in self.friday["breakfast"]] if self.friday is not None and self.friday["breakfast"] is not None else []}', '{[item.id for item in self.friday["lunch"]] if self.friday is not None and self.friday["lunch"] is not None else []}', '{[item.id for item in self.friday["snacks"]] if self.friday is not None and self.friday["snacks"] is not None else []}', '{[item.id for item in self.friday["dinner"]] if self.friday is not None and self.friday["dinner"] is not None else []}', '{[item.id for item in self.saturday["breakfast"]] if self.saturday is not None and self.saturday["breakfast"] is not None else []}', '{[item.id for item in self.saturday["lunch"]] if self.saturday is not None and self.saturday["lunch"] is not None else []}', '{[item.id for item in self.saturday["snacks"]] if self.saturday is not None and self.saturday["snacks"] is not None else []}', '{[item.id for item in self.saturday["dinner"]] if self.saturday is not None and self.saturday["dinner"] is not None else []}', '{[item.id for item in self.sunday["breakfast"]] if self.sunday is not None and self.sunday["breakfast"] is not None else []}', '{[item.id for item in self.sunday["lunch"]] if self.sunday is not None and self.sunday["lunch"] is not None else []}', '{[item.id for item in self.sunday["snacks"]] if self.sunday is not None and self.sunday["snacks"] is not None else []}', '{[item.id for item in self.sunday["dinner"]] if self.sunday is not None and self.sunday["dinner"] is not None else []}') RETURNING id""",
+        result = await fetchone(
+            con,
+            "INSERT INTO mess_menus (month, year) VALUES (%s, %s) RETURNING id",
             (self.month, self.year),
         )
 
-        con.commit()
-
-        self.id = cursor.fetchone()[0]
-        cursor.close()
-
-        await self.sync_details(con)
+        self.id = result[0]
 
-    async def update(self, con: psycopg2.extensions.connection) -> None:
-        cursor = con.cursor()
+        await self._insert_slots(con, SLOTS)
+        await commit(con)
+        invalidate_meal_index()
 
-        cursor.execute(
-            f"""UPDATE mess_menus SET monday_breakfast='{[item.id for item in self.monday["breakfast"]] if self.monday is not None and self.monday["breakfast"] is not None else []}', monday_lunch='{[item.id for item in self.monday["lunch"]] if self.monday is not None and self.monday["lunch"] is not None else []}', monday_snacks='{[item.id for item in self.monday["snacks"]] if self.monday is not None and self.monday["snacks"] is not None else []}', monday_dinner='{[item.id for item in self.monday["dinner"]] if self.monday is not None and self.monday["dinner"] is not None else []}', tuesday_breakfast='{[item.id for item in self.tuesday["breakfast"]] if self.tuesday is not None and self.tuesday["breakfast"] is not None else []}', tuesday_lunch='{[item.id for item in self.tuesday["lunch"]] if self.tuesday is not None and self.tuesday["lunch"] is not None else []}', tuesday_snacks='{[item.id for item in self.tuesday["snacks"]] if self.tuesday is not None and self.tuesday["snacks"] is not None else []}', tuesday_dinner='{[item.id for item in self.tuesday["dinner"]] if self.tuesday is not None and self.tuesday["dinner"] is not None else []}', wednesday_breakfast='{[item.id for item in self.wednesday["breakfast"]] if self.wednesday is not None and self.wednesday["breakfast"] is not None else []}', wednesday_lunch='{[item.id for item in self.wednesday["lunch"]] if self.wednesday is not None and self.wednesday["lunch"] is not None else []}', wednesday_snacks='{[item.id for item in self.wednesday["snacks"]] if self.wednesday is not None and self.wednesday["snacks"] is not None else []}', wednesday_dinner='{[item.id for item in self.wednesday["dinner"]] if self.wednesday is not None and self.wednesday["dinner"] is not None else []}', thursday_breakfast='{[item.id for item in self.thursday["breakfast"]] if self.thursday is not None and self.thursday["breakfast"] is not None else []}', thursday_lunch='{[item.id for item in self.thursday["lunch"]] if self.thursday is not None and self.thursday["lunch"] is not None else []}', thursday_snacks='{[item.id for item in self.thursday["snacks"]] if self.thursday is not None and self.thursday["snacks"] is not None else []}', thursday_dinner='{[item.id for item in self.thursday["dinner"]] if self.thursday is not None and self.thursday["dinner"] is not None else []}', friday_breakfast='{[item.id for item in self.friday["breakfast"]] if self.friday is not None and self.friday["breakfast"] is not None else []}', friday_lunch='{[item.id for item in self.friday["lunch"]] if self.friday is not None and self.friday["lunch"] is not None else []}', friday_snacks='{[item.id for item in self.friday["snacks"]] if self.friday is not None and self.friday["snacks"] is not None else []}', friday_dinner='{[item.id for item in self.friday["dinner"]] if self.friday is not None and self.friday["dinner"] is not None else []}', saturday_breakfast='{[item.id for item in self.saturday["breakfast"]] if self.saturday is not None and self.saturday["breakfast"] is not None else []}', saturday_lunch='{[item.id for item in self.saturday["lunch"]] if self.saturday is not None and self.saturday["lunch"] is not None else []}', saturday_snacks='{[item.id for item in self.saturday["snacks"]] if self.saturday is not None and self.saturday["snacks"] is not None else []}', saturday_dinner='{[item.id for item in self.saturday["dinner"]] if self.saturday is not None and self.saturday["dinner"] is not None else []}', sunday_breakfast='{[item.id for item in self.sunday["breakfast"]] if self.sunday is not None and self.sunday["breakfast"] is not None else []}', sunday_lunch='{[item.id for item in self.sunday["lunch"]] if self.sunday is not None and self.sunday["lunch"] is not None else []}', sunday_snacks='{[item.id for item in self.sunday["snacks"]] if self.sunday is not None and self.sunday["snacks"] is not None else []}', sunday_dinner='{[item.id for item in self.sunday["dinner"]] if self.sunday is not None and self.sunday["dinner"] is not None else []}' WHERE id={self.id}""",
-        )
+        self._fill_empty_slots()
 
-        con.commit()
-
-        cursor.close()
+    async def update(
+        self,
+        con: psycopg2.extensions.connection,
+        slots: list[tuple[str, str]] | None = None,
+    ) -> None:
+        """
+        Rewrites the entries of the given (day, meal) slots, or of every slot
+        when none are given.
+        """
+        await self._replace_slots(con, slots if slots is not None else SLOTS)
+        await commit(con)
+        invalidate_meal_index()
 
-        await self.sync_details(con)
+        self._fill_empty_slots()
 
     async def remove(self, con: psycopg2.extensions.connection) -> None:
-        cursor = con.cursor()
-
-        cursor.execute(f"DELETE FROM mess_menus WHERE id={self.id}")
-        con.commit()
+        # Entries go with the menu through ON DELETE CASCADE.
+        await execute(con, "DELETE FROM mess_menus WHERE id=%s", (self.id,))
+        await commit(con)
+        invalidate_meal_index()
+
+
+async def get_current_mess_menu(
+    con: psycopg2.extensions.connection,
+    mess_id: int,
+    day: str | None = None,
+    meal: str | None = None,
+) -> MessMenu | None:
+    """
+    Loads the current menu of a mess without hydrating the mess itself,
+    optionally projected to a single day and/or meal.
+    """
+    result = await fetchone(
+        con,
+        "SELECT mm.id, mm.month, mm.year FROM messes m LEFT JOIN mess_menus mm ON mm.id = m.menu_id WHERE m.id=%s",
+        (mess_id,),
+    )
+
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Mess not found",
+        )
 
-        cursor.close()
+    if result[0] is None:
+        return None
+
+    menu = MessMenu(id=result[0], month=result[1], year=result[2])
+    await menu._sync_entries(con, day, meal)
+
+    return menu
+
+
+async def get_mess_menus(
+    con: psycopg2.extensions.connection,
+    month: int | None = None,
+    year: int | None = None,
+    after_id: int | None = None,
+    limit: int | None = None,
+) -> list[MessMenu]:
+    """
+    Lists menus in id order, filtered by month/year and paged by keyset on id.
+    The entries of every menu on the page are loaded in one query.
+    """
+    conditions = []
+    params: list = []
+
+    if year is not None:
+        conditions.append("year=%s")
+        params.append(year)
+    if month is not None:
+        conditions.append("month=%s")
+        params.append(month)
+    if after_id is not None:
+        conditions.append("id>%s")
+        params.append(after_id)
+
+    query = "SELECT id, month, year FROM mess_menus"
+    if len(conditions) > 0:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY id"
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+
+    result = await fetchall(con, query, tuple(params))
+    menus = [MessMenu(id=row[0], month=row[1], year=row[2]) for row in result]
+
+    if len(menus) == 0:
+        return menus
+
+    result = await fetchall(
+        con,
+        f"SELECT e.menu_id, e.day, e.meal, {MESS_MENU_ITEM_COLUMNS} FROM mess_menu_entries e JOIN mess_menu_items i ON i.id = e.item_id WHERE e.menu_id = ANY(%s) ORDER BY e.menu_id, e.day, e.meal, e.position",
+        ([menu.id for menu in menus],),
+    )
+
+    entries: dict[int, list[tuple[str, str, MessMenuItem]]] = {
+        menu.id: [] for menu in menus
+    }
+    for row in result:
+        entries[row[0]].append((row[1], row[2], mess_menu_item_from_row(row[3:])))
+
+    for menu in menus:
+        menu._fill_entries(entries[menu.id])
+
+    return menus
+
+
+async def get_mess_menu_meals(
+    con: psycopg2.extensions.connection, slots: list[tuple[int, str, str]]
+) -> dict[tuple[int, str, str], list[MessMenuItem]]:
+    """
+    Loads the items of several (menu id, day, meal) slots in one query.
+    """
+    if len(slots) == 0:
+        return {}
+
+    result = await fetchall(
+        con,
+        f"SELECT e.menu_id, e.day, e.meal, {MESS_MENU_ITEM_COLUMNS} FROM mess_menu_entries e JOIN mess_menu_items i ON i.id = e.item_id WHERE (e.menu_id, e.day, e.meal) IN (SELECT * FROM unnest(%s::int[], %s::text[], %s::text[])) ORDER BY e.menu_id, e.day, e.meal, e.position",
+        (
+            [menu_id for menu_id, _, _ in slots],
+            [day for _, day, _ in slots],
+            [meal for _, _, meal in slots],
+        ),
+    )
+
+    meals: dict[tuple[int, str, str], list[MessMenuItem]] = {slot: [] for slot in slots}
+    for row in result:
+        meals[(row[0], row[1], row[2])].append(mess_menu_item_from_row(row[3:]))
+
+    return meals
 
 
 class Timings(TypedDict):
@@ -458,6 +485,31 @@ class MessTimings(TypedDict):
     dinner: Timings
 
 
+# Fetches messes together with their current menu and every entry on it in a
+# single round trip. Each entry comes back as a [day, meal, item] JSON array,
+# in position order within its slot.
+MESS_AGGREGATE_QUERY = """
+SELECT
+    m.id, m.name, m.location, m.landmark, m.timings, m.rating, m.image,
+    CASE WHEN mm.id IS NOT NULL THEN
+        jsonb_build_object('id', mm.id, 'month', mm.month, 'year', mm.year)
+    END AS menu,
+    (
+        SELECT jsonb_agg(
+            jsonb_build_array(e.day, e.meal, to_jsonb(i))
+            ORDER BY e.day, e.meal, e.position
+        )
+        FROM mess_menu_entries e
+        JOIN mess_menu_items i ON i.id = e.item_id
+        WHERE e.menu_id = mm.id
+    ) AS menu_entries
+FROM messes m
+LEFT JOIN mess_menus mm ON mm.id = m.menu_id
+WHERE {where}
+ORDER BY m.id
+"""
+
+
 class Mess:
     def __init__(
         self,
@@ -480,76 +532,95 @@ class Mess:
         self.image = image
 
     async def sync_details(self, con: psycopg2.extensions.connection) -> None:
-        cursor = con.cursor()
-
         if self.id is not None:
-            cursor.execute(f"SELECT * FROM messes WHERE id={self.id}")
+            result = await fetchone(
+                con, MESS_AGGREGATE_QUERY.format(where="m.id=%s"), (self.id,)
+            )
         elif self.name is not None:
-            cursor.execute("SELECT * FROM messes WHERE name=%s", (self.name,))
+            result = await fetchone(
+                con, MESS_AGGREGATE_QUERY.format(where="m.name=%s"), (self.name,)
+            )
         else:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Insufficient data to fetch mess details",
             )
 
-        result = cursor.fetchone()
-        cursor.close()
-
-        try:
-            self.id = result[0]
-            self.name = result[1]
-            self.location = (
-                Location(
-                    latitude=result[2]["latitude"], longitude=result[2]["longitude"]
-                )
-                if result[2] is not None
-                else None
-            )
-            self.landmark = result[3]
-
-            timings = result[4]
-
-            self.timings = (
-                {
-                    "breakfast": {
-                        "start": timings["breakfast"]["start"],
-                        "end": timings["breakfast"]["end"],
-                    },
-                    "lunch": {
-                        "start": timings["lunch"]["start"],
-                        "end": timings["lunch"]["end"],
-                    },
-                    "snacks": {
-                        "start": timings["snacks"]["start"],
-                        "end": timings["snacks"]["end"],
-                    },
-                    "dinner": {
-                        "start": timings["dinner"]["start"],
-                        "end": timings["dinner"]["end"],
-                    },
-                }
-                if timings is not None
-                else None
+        if result is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Mess not found",
             )
 
-            self.rating = result[5]
+        self._load_aggregate(result)
 
-            self.menu = MessMenu(id=result[6]) if result[6] is not None else None
-            if self.menu is not None:
-                await self.menu.sync_details(con)
+    def _load_aggregate(self, result: tuple) -> None:
+        self.id = result[0]
+        self.name = result[1]
+        self.location = (
+            Location(latitude=result[2]["latitude"], longitude=result[2]["longitude"])
+            if result[2] is not None
+            else None
+        )
+        self.landmark = result[3]
+
+        timings = result[4]
+
+        self.timings = (
+            {
+                "breakfast": {
+                    "start": timings["breakfast"]["start"],
+                    "end": timings["breakfast"]["end"],
+                },
+                "lunch": {
+                    "start": timings["lunch"]["start"],
+                    "end": timings["lunch"]["end"],
+                },
+                "snacks": {
+                    "start": timings["snacks"]["start"],
+                    "end": timings["snacks"]["end"],
+                },
+                "dinner": {
+                    "start": timings["dinner"]["start"],
+                    "end": timings["dinner"]["end"],
+                },
+            }
+            if timings is not None
+            else None
+        )
 
-            self.image = result[7]
+        self.rating = result[5]
+        self.image = result[6]
 
-        except TypeError:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Mess not found",
+        menu: dict | None = result[7]
+        if menu is None:
+            self.menu = None
+            return
+
+        entries = [
+            (
+                day,
+                meal,
+                mess_menu_item_from_row(
+                    (
+                        item["id"],
+                        item["name"],
+                        item["description"],
+                        item["rating"],
+                        item["cal"],
+                        item["image"],
+                    )
+                ),
             )
+            for day, meal, item in result[8] or []
+        ]
 
-    async def create(self, con: psycopg2.extensions.connection) -> None:
-        cursor = con.cursor()
+        self.menu = MessMenu(id=menu["id"], month=menu["month"], year=menu["year"])
+        self.menu._fill_entries(entries)
 
-        cursor.execute(
+    async def create(self, con: psycopg2.extensions.connection) -> None:
+        result = await fetchone(
+            con,
             f"INSERT INTO messes (name, location, landmark, timings, rating, image) VALUES (%s, {json_to_sql({'latitude': self.location.latitude, 'longitude': self.location.longitude}) if self.location is not None else 'NULL'}, %s, {json_to_sql({'breakfast': {'start': self.timings['breakfast']['start'], 'end': self.timings['breakfast']['end']}, 'lunch': {'start': self.timings['lunch']['start'], 'end': self.timings['lunch']['end']}, 'snacks': {'start': self.timings['snacks']['start'],'end': self.timings['snacks']['end']}, 'dinner': {'start': self.timings['dinner']['start'], 'end': self.timings['dinner']['end']}}) if self.timings is not None else 'NULL'}, %s, %s) RETURNING id",
             (
                 self.name,
@@ -559,17 +630,16 @@ class Mess:
             ),
         )
 
-        con.commit()
+        await commit(con)
+        invalidate_meal_index()
 
-        self.id = cursor.fetchone()[0]
-        cursor.close()
+        self.id = result[0]
 
-        self.sync_details(con)
+        await self.sync_details(con)
 
     async def update(self, con: psycopg2.extensions.connection) -> None:
-        cursor = con.cursor()
-
-        cursor.execute(
+        await execute(
+            con,
             f"UPDATE messes SET name=%s, location={json_to_sql({'latitude': self.location.latitude, 'longitude': self.location.longitude}) if self.location is not None else 'NULL'}, landmark=%s, timings={json_to_sql({'breakfast': {'start': self.timings['breakfast']['start'], 'end': self.timings['breakfast']['end']}, 'lunch': {'start': self.timings['lunch']['start'], 'end': self.timings['lunch']['end']}, 'snacks': {'start': self.timings['snacks']['start'], 'end': self.timings['snacks']['end']}, 'dinner': {'start': self.timings['dinner']['start'], 'end': self.timings['dinner']['end']}}) if self.timings is not None else 'NULL'}, rating=%s, menu_id=%s, image=%s WHERE id=%s",
             (
                 self.name,
@@ -581,15 +651,24 @@ class Mess:
             ),
         )
 
-        con.commit()
-        cursor.close()
+        await commit(con)
+        invalidate_meal_index()
 
-        self.sync_details(con)
+        await self.sync_details(con)
 
     async def remove(self, con: psycopg2.extensions.connection) -> None:
-        cursor = con.cursor()
+        await execute(con, "DELETE FROM messes WHERE id=%s", (self.id,))
+        await commit(con)
+        invalidate_meal_index()
+
+
+async def get_messes(con: psycopg2.extensions.connection) -> list[Mess]:
+    result = await fetchall(con, MESS_AGGREGATE_QUERY.format(where="TRUE"))
 
-        cursor.execute(f"DELETE FROM messes WHERE id={self.id}")
-        con.commit()
+    messes = []
+    for row in result:
+        mess = Mess()
+        mess._load_aggregate(row)
+        messes.append(mess)
 
-        cursor.close()
+    return messes
@@ -0,0 +1,128 @@
+from app.db import fetchall
+from bisect import bisect_right
+from datetime import datetime, time
+import psycopg2.extensions
+
+
+MINUTES_PER_DAY = 24 * 60
+
+TIME_FORMATS = ["%H:%M", "%H:%M:%S", "%I:%M %p", "%I:%M%p", "%I %p"]
+
+
+def parse_meal_time(value: str) -> time | None:
+    for format in TIME_FORMATS:
+        try:
+            return datetime.strptime(value.strip().upper(), format).time()
+        except ValueError:
+            continue
+
+    return None
+
+
+class MealInterval:
+    def __init__(self, meal: str, start: time, end: time) -> None:
+        self.meal = meal
+        self.start = start
+        self.end = end
+
+        # Minutes since midnight. A meal that ends at or before its start runs
+        # past midnight, so its end is pushed into the next day.
+        self.start_minute = start.hour * 60 + start.minute
+        self.end_minute = end.hour * 60 + end.minute
+        if self.end_minute <= self.start_minute:
+            self.end_minute += MINUTES_PER_DAY
+
+
+class MessMealSchedule:
+    def __init__(
+        self,
+        mess_id: int,
+        name: str,
+        menu_id: int | None,
+        intervals: list[MealInterval],
+    ) -> None:
+        self.mess_id = mess_id
+        self.name = name
+        self.menu_id = menu_id
+        self.intervals = sorted(intervals, key=lambda interval: interval.start_minute)
+        self._starts = [interval.start_minute for interval in self.intervals]
+
+    def find(self, minute: int) -> tuple[MealInterval, int, bool] | None:
+        """
+        Returns the meal being served at `minute` (minutes since midnight), or
+        the next one if none is, as (interval, day offset, serving). The day
+        offset is -1 for a meal that started yesterday and runs past midnight,
+        and 1 for a meal that only starts tomorrow.
+        """
+        if len(self.intervals) == 0:
+            return None
+
+        index = bisect_right(self._starts, minute) - 1
+        if index >= 0 and minute < self.intervals[index].end_minute:
+            return self.intervals[index], 0, True
+
+        last = self.intervals[-1]
+        if minute + MINUTES_PER_DAY < last.end_minute:
+            return last, -1, True
+
+        if index + 1 < len(self.intervals):
+            return self.intervals[index + 1], 0, False
+
+        return self.intervals[0], 1, False
+
+
+class MealIndex:
+    def __init__(self, schedules: list[MessMealSchedule]) -> None:
+        self.schedules = schedules
+
+    @classmethod
+    def from_rows(cls, rows: list[tuple]) -> "MealIndex":
+        schedules = []
+        for mess_id, name, menu_id, timings in rows:
+            intervals = []
+            for meal, timing in (timings or {}).items():
+                if timing is None:
+                    continue
+
+                start = parse_meal_time(timing["start"])
+                end = parse_meal_time(timing["end"])
+                if start is None or end is None:
+                    continue
+
+                intervals.append(MealInterval(meal, start, end))
+
+            schedules.append(MessMealSchedule(mess_id, name, menu_id, intervals))
+
+        return cls(schedules)
+
+
+# The index is rebuilt lazily on the first read after any mess or menu write.
+# The generation counter keeps a build that raced with a write from being
+# installed.
+_index: MealIndex | None = None
+_generation = 0
+
+
+def invalidate_meal_index() -> None:
+    global _index, _generation
+
+    _index = None
+    _generation += 1
+
+
+async def get_meal_index(con: psycopg2.extensions.connection) -> MealIndex:
+    global _index
+
+    if _index is not None:
+        return _index
+
+    generation = _generation
+    result = await fetchall(
+        con, "SELECT id, name, menu_id, timings FROM messes ORDER BY id"
+    )
+    index = MealIndex.from_rows(result)
+
+    if generation == _generation:
+        _index = index
+
+    return index
@@ -1,11 +1,26 @@
-from typing import Optional, List
+from typing import Literal, Optional, List
 from app.models.globals import Location
 from datetime import time
 from fastapi import HTTPException, status
 import psycopg2
 import psycopg2.extensions
-import geopy.distance
-from app.db import disconnect
+import json
+from app.db import commit, execute, fetchall, fetchone
+from app.utils import identity_map
+from app.utils.predicates import Predicate, PredicatePipeline
+from app.models.outlet_index import (
+    get_item_index,
+    get_outlet_catalogue,
+    invalidate_outlet_catalogue,
+    remove_from_item_index,
+    remove_outlet_from_item_index,
+    update_item_index,
+)
+
+
+FOOD_OUTLET_COLUMNS = (
+    "id, name, location, landmark, open_time, close_time, rating, image"
+)
 
 
 class FoodOutletMenuItem:
@@ -32,24 +47,21 @@ class FoodOutletMenuItem:
         self.image = image
 
     async def sync_details(self, con: psycopg2.extensions.connection):
-        cursor = con.cursor()
-
         if self.id is not None:
-            cursor.execute(f"SELECT * FROM food_outlet_menu_items WHERE id={self.id}")
+            result = await fetchone(
+                con, "SELECT * FROM food_outlet_menu_items WHERE id=%s", (self.id,)
+            )
         elif (self.name is not None) and (self.outlet_id is not None):
-            cursor.execute(
-                f"SELECT * FROM food_outlet_menu_items WHERE name=%s AND food_outlet_id={self.outlet_id}",
-                (self.name),
+            result = await fetchone(
+                con,
+                "SELECT * FROM food_outlet_menu_items WHERE name=%s AND food_outlet_id=%s",
+                (self.name, self.outlet_id),
             )
         else:
-            disconnect(con)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient data"
             )
 
-        result = cursor.fetchone()
-        cursor.close()
-
         try:
             self.id = result[0]
             self.name = result[1]
@@ -66,9 +78,8 @@ class FoodOutletMenuItem:
             )
 
     async def create(self, con: psycopg2.extensions.connection):
-        cursor = con.cursor()
-
-        cursor.execute(
+        result = await fetchone(
+            con,
             "INSERT INTO food_outlet_menu_items (name, price, food_outlet_id, description, rating, size, cal, image) VALUES (%s, %s, %s, %s, %s, %s, %s, %s) RETURNING id",
             (
                 self.name,
@@ -82,28 +93,15 @@ class FoodOutletMenuItem:
             ),
         )
 
-        self.id = cursor.fetchone()[0]
-        con.commit()
-
-        cursor.execute(f"SELECT menu FROM food_outlets WHERE id={self.outlet_id}")
-        result = cursor.fetchone()
-        menu = list(result[0])
-
-        menu.append(self.id)
-
-        cursor.execute(
-            f"UPDATE food_outlets SET menu='[{', '.join([str(item_id) for item_id in menu])}]' WHERE id={self.outlet_id}"
-        )
-        con.commit()
-
-        cursor.close()
-        await self.sync_details(con=con)
+        self.id = result[0]
+        await commit(con)
+        invalidate_outlet_catalogue()
+        update_item_index(self.id, self.name, self.outlet_id, self.price, self.cal)
 
     async def update(self, con: psycopg2.extensions.connection):
-        cursor = con.cursor()
-
-        cursor.execute(
-            f"UPDATE food_outlet_menu_items SET name=%s, price=%s, food_outlet_id=%s, description=%s, rating=%s, size=%s, cal=%s, image=%s WHERE id={self.id}",
+        await execute(
+            con,
+            "UPDATE food_outlet_menu_items SET name=%s, price=%s, food_outlet_id=%s, description=%s, rating=%s, size=%s, cal=%s, image=%s WHERE id=%s",
             (
                 self.name,
                 self.price,
@@ -113,29 +111,79 @@ class FoodOutletMenuItem:
                 self.size,
                 self.cal,
                 self.image,
+                self.id,
             ),
         )
-        con.commit()
-        cursor.close()
+        await commit(con)
+        invalidate_outlet_catalogue()
+        update_item_index(self.id, self.name, self.outlet_id, self.price, self.cal)
 
     async def remove(self, con: psycopg2.extensions.connection):
-        cursor = con.cursor()
+        await execute(con, "DELETE FROM food_outlet_menu_items WHERE id=%s", (self.id,))
+        await commit(con)
+        invalidate_outlet_catalogue()
+        remove_from_item_index(self.id)
+
+
+def food_outlet_menu_item_from_row(row: tuple) -> FoodOutletMenuItem:
+    return identity_map.get_or_build(
+        FoodOutletMenuItem,
+        row[0],
+        lambda: FoodOutletMenuItem(
+            id=row[0],
+            name=row[1],
+            price=int(row[2]),
+            description=row[3],
+            rating=row[4],
+            size=row[5],
+            cal=row[6],
+            image=row[7],
+            outlet_id=row[8],
+        ),
+    )
 
-        cursor.execute(f"SELECT menu FROM food_outlets WHERE id={self.outlet_id}")
-        result = cursor.fetchone()
-        menu = list(result[0])
 
-        menu.remove(self.id)
+async def get_food_outlet_menu_items(
+    con: psycopg2.extensions.connection, ids: Optional[List[int]] = None
+) -> List[FoodOutletMenuItem]:
+    """
+    Loads menu items in one query, in id order without `ids` and in the order
+    of `ids` otherwise.
+    """
+    if ids is None:
+        result = await fetchall(con, "SELECT * FROM food_outlet_menu_items ORDER BY id")
+        return [food_outlet_menu_item_from_row(row) for row in result]
+
+    if len(ids) == 0:
+        return []
+
+    result = await fetchall(
+        con,
+        "SELECT * FROM food_outlet_menu_items WHERE id = ANY(%s)",
+        (list(ids),),
+    )
+    items = {row[0]: food_outlet_menu_item_from_row(row) for row in result}
 
-        cursor.execute(
-            f"UPDATE food_outlets SET menu='[{', '.join([str(id) for id in menu])}]' WHERE id={self.outlet_id}",
-        )
+    return [items[id] for id in ids if id in items]
+
+
+async def searchMenuItems(
+    con: psycopg2.extensions.connection,
+    minPriceFilter: Optional[int] = None,
+    maxPriceFilter: Optional[int] = None,
+    maxCalFilter: Optional[int] = None,
+    sortBy: Optional[Literal["price"]] = None,
+) -> List[FoodOutletMenuItem]:
+    filters = (minPriceFilter, maxPriceFilter, maxCalFilter)
+    if sortBy is None and all(value is None for value in filters):
+        return await get_food_outlet_menu_items(con)
 
-        con.commit()
+    item_index = await get_item_index(con)
+    ids = item_index.filter_items(None, *filters)
+    if sortBy == "price":
+        ids = item_index.by_price(ids)
 
-        cursor.execute(f"DELETE FROM food_outlet_menu_items WHERE id={self.id}")
-        con.commit()
-        cursor.close()
+    return await get_food_outlet_menu_items(con, ids)
 
 
 class FoodOutlet:
@@ -162,60 +210,57 @@ class FoodOutlet:
         self.image = image
 
     async def sync_details(self, con: psycopg2.extensions.connection):
-        cursor = con.cursor()
-
         if self.id is not None:
-            cursor.execute(f"SELECT * FROM food_outlets WHERE id={self.id}")
+            result = await fetchone(
+                con,
+                f"SELECT {FOOD_OUTLET_COLUMNS} FROM food_outlets WHERE id=%s",
+                (self.id,),
+            )
         elif self.name is not None:
-            cursor.execute(f"SELECT * FROM food_outlets WHERE name='{self.name}'")
+            result = await fetchone(
+                con,
+                f"SELECT {FOOD_OUTLET_COLUMNS} FROM food_outlets WHERE name=%s",
+                (self.name,),
+            )
         else:
-            cursor.close()
-            con.close()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient data"
             )
 
-        result = cursor.fetchone()
-
-        cursor.close()
-
-        try:
-            self.id = result[0]
-            self.name = result[1]
-            self.location = (
-                Location(
-                    latitude=result[2]["latitude"], longitude=result[2]["longitude"]
-                )
-                if result[2] is not None
-                else None
-            )
-            self.landmark = result[3]
-            self.open_time = result[4]
-            self.close_time = result[5]
-            self.rating = result[6]
-
-            menu_ids = result[7] if result[7] is not None else []
-            menu = []
-            for i in range(len(menu_ids)):
-                item = FoodOutletMenuItem(id=menu_ids[i])
-                await item.sync_details(con=con)
-                menu.append(item)
-            self.menu = menu if len(menu) > 0 else None
-
-            self.image = result[8]
-        except TypeError as e:
-            # print(e)
-            # print("disconnected here")
-            disconnect(con)
+        if result is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Food Outlet not found"
             )
 
-    async def create(self, con: psycopg2.extensions.connection):
-        cursor = con.cursor()
+        self._load_row(result)
 
+        result = await fetchall(
+            con,
+            "SELECT * FROM food_outlet_menu_items WHERE food_outlet_id=%s ORDER BY id",
+            (self.id,),
+        )
+        self._load_menu([food_outlet_menu_item_from_row(row) for row in result])
+
+    def _load_row(self, result: tuple) -> None:
+        self.id = result[0]
+        self.name = result[1]
+        self.location = (
+            Location(latitude=result[2]["latitude"], longitude=result[2]["longitude"])
+            if result[2] is not None
+            else None
+        )
+        self.landmark = result[3]
+        self.open_time = result[4]
+        self.close_time = result[5]
+        self.rating = result[6]
+        self.image = result[7]
+
+    def _load_menu(self, menu: List[FoodOutletMenuItem]) -> None:
+        self.menu = menu if len(menu) > 0 else None
+
+    async def create(self, con: psycopg2.extensions.connection):
         location_value = (
-            str(
+            json.dumps(
                 {
                     "latitude": self.location.latitude,
                     "longitude": self.location.longitude,
@@ -225,10 +270,9 @@ class FoodOutlet:
             else None
         )
 
-        menu_value = [item.id for item in self.menu] if self.menu is not None else None
-
-        cursor.execute(
-            f"INSERT INTO food_outlets(name, location, landmark, open_time, close_time, rating, menu, image) VALUES(%s, %s, %s, %s, %s, %s, %s, %s) RETURNING id",
+        result = await fetchone(
+            con,
+            "INSERT INTO food_outlets(name, location, landmark, open_time, close_time, rating, image) VALUES(%s, %s, %s, %s, %s, %s, %s) RETURNING id",
             (
                 self.name,
                 location_value,
@@ -236,21 +280,18 @@ class FoodOutlet:
                 self.open_time,
                 self.close_time,
                 self.rating,
-                menu_value,
                 self.image,
             ),
         )
 
-        self.id = cursor.fetchone()[0]
-        con.commit()
-        cursor.close()
+        self.id = result[0]
+        await commit(con)
+        invalidate_outlet_catalogue()
         await self.sync_details(con)
 
     async def update(self, con: psycopg2.extensions.connection):
-        cursor = con.cursor()
-
         location_value = (
-            str(
+            json.dumps(
                 {
                     "latitude": self.location.latitude,
                     "longitude": self.location.longitude,
@@ -260,10 +301,9 @@ class FoodOutlet:
             else None
         )
 
-        menu_value = [item.id for item in self.menu] if self.menu is not None else None
-
-        cursor.execute(
-            f"UPDATE food_outlets SET name=%s, location=%s, landmark=%s, open_time=%s, close_time=%s, rating=%s, menu=%s, image=%s WHERE id={self.id}",
+        await execute(
+            con,
+            "UPDATE food_outlets SET name=%s, location=%s, landmark=%s, open_time=%s, close_time=%s, rating=%s, image=%s WHERE id=%s",
             (
                 self.name,
                 location_value,
@@ -271,139 +311,223 @@ class FoodOutlet:
                 self.open_time,
                 self.close_time,
                 self.rating,
-                menu_value,
                 self.image,
+                self.id,
             ),
         )
-        con.commit()
-        cursor.close()
+        await commit(con)
+        invalidate_outlet_catalogue()
         await self.sync_details(con)
 
     async def remove(self, con: psycopg2.extensions.connection):
-        cursor = con.cursor()
+        await execute(con, "DELETE FROM food_outlets WHERE id=%s", (self.id,))
+        await commit(con)
+        invalidate_outlet_catalogue()
+        remove_outlet_from_item_index(self.id)
+
+
+async def get_food_outlets(
+    con: psycopg2.extensions.connection, ids: Optional[List[int]] = None
+) -> List[FoodOutlet]:
+    """
+    Loads outlets together with their menus in two queries, one for the outlets
+    and one for all of their items. Without `ids` every outlet is loaded in id
+    order; otherwise outlets come back in the order of `ids`, skipping ids that
+    do not exist.
+    """
+    if ids is None:
+        result = await fetchall(
+            con, f"SELECT {FOOD_OUTLET_COLUMNS} FROM food_outlets ORDER BY id"
+        )
+    elif len(ids) == 0:
+        return []
+    else:
+        result = await fetchall(
+            con,
+            f"SELECT {FOOD_OUTLET_COLUMNS} FROM food_outlets WHERE id = ANY(%s)",
+            (list(ids),),
+        )
 
-        cursor.execute(f"DELETE FROM food_outlets WHERE id={self.id}")
-        con.commit()
-        cursor.close()
+    outlets: dict[int, FoodOutlet] = {}
+    for row in result:
+        outlet = FoodOutlet()
+        outlet._load_row(row)
+        outlets[outlet.id] = outlet
 
+    if len(outlets) == 0:
+        return []
 
-async def searchOutlets(
-    con: psycopg2.extensions.connection,
+    result = await fetchall(
+        con,
+        "SELECT * FROM food_outlet_menu_items WHERE food_outlet_id = ANY(%s) ORDER BY id",
+        (list(outlets),),
+    )
+
+    menus: dict[int, List[FoodOutletMenuItem]] = {id: [] for id in outlets}
+    for row in result:
+        item = food_outlet_menu_item_from_row(row)
+        menus[item.outlet_id].append(item)
+
+    for id, outlet in outlets.items():
+        outlet._load_menu(menus[id])
+
+    if ids is None:
+        return list(outlets.values())
+
+    return [outlets[id] for id in ids if id in outlets]
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_outlet_search_query(
     nameFilter: Optional[str] = None,
-    locationFilter: Optional[Location] = None,
     landmarkFilter: Optional[str] = None,
-    timeFilter: Optional[time] = None,
     ratingFilter: Optional[float] = None,
-    itemFilter: Optional[str] = None,
-) -> List:
-    cursor = con.cursor()
-
-    cursor.execute(f"SELECT id FROM food_outlets")
-    result = cursor.fetchall()
+    idsFilter: Optional[List[int]] = None,
+) -> tuple[str, list]:
+    """
+    Turns the SQL-expressible search predicates into one parameterized query
+    returning the ids of matching outlets.
+    """
+    conditions = []
+    params: list = []
+
+    if idsFilter is not None:
+        conditions.append("o.id = ANY(%s)")
+        params.append(idsFilter)
+
+    if nameFilter is not None:
+        conditions.append("o.name ILIKE %s")
+        params.append(f"%{escape_like(nameFilter)}%")
+
+    if landmarkFilter is not None:
+        conditions.append("o.landmark ILIKE %s")
+        params.append(f"%{escape_like(landmarkFilter)}%")
+
+    if ratingFilter is not None:
+        conditions.append("o.rating >= %s")
+        params.append(ratingFilter)
+
+    query = "SELECT o.id FROM food_outlets o"
+    if len(conditions) > 0:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY o.id"
+
+    return query, params
+
+
+def parse_search_location(locationFilter: Location) -> tuple[float, float]:
+    try:
+        return float(locationFilter.latitude), float(locationFilter.longitude)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid location"
+        )
 
-    outlets: List[FoodOutlet] = []
 
-    for row in result:
-        outlet = FoodOutlet(id=row[0])
-        outlets.append(outlet)
-
-    cursor.close()
-
-    for outlet in outlets:
-        await outlet.sync_details(con=con)
-        if outlet.menu is not None:
-            for item in outlet.menu:
-                await item.sync_details(con=con)
-
-    outlets = list(
-        filter(
-            lambda outlet: True
-            if nameFilter is None
-            else (True if outlet.name.find(nameFilter) != -1 else False),
-            outlets,
+async def build_outlet_search_predicates(
+    con: psycopg2.extensions.connection,
+    locationFilter: Optional[Location] = None,
+    timeFilter: Optional[time] = None,
+    itemFilter: Optional[str] = None,
+    radiusFilter: float = 1,
+    minPriceFilter: Optional[int] = None,
+    maxPriceFilter: Optional[int] = None,
+    maxCalFilter: Optional[int] = None,
+) -> List[Predicate[int]]:
+    """
+    Builds the in-process search predicates over outlet ids. Set lookups are
+    cheap; the exact distance check is only reached by outlets that pass
+    everything else.
+    """
+    predicates: List[Predicate[int]] = []
+
+    item_filters = (itemFilter, minPriceFilter, maxPriceFilter, maxCalFilter)
+    if any(value is not None for value in item_filters):
+        item_index = await get_item_index(con)
+        selling_ids = item_index.outlets_of(item_index.filter_items(*item_filters))
+        predicates.append(Predicate("menu_item", 1, selling_ids.__contains__))
+
+    if timeFilter is not None:
+        catalogue = await get_outlet_catalogue(con)
+        open_ids = catalogue.open.open_at(timeFilter)
+        predicates.append(Predicate("open_at", 1, open_ids.__contains__))
+
+    if locationFilter is not None:
+        latitude, longitude = parse_search_location(locationFilter)
+        grid = (await get_outlet_catalogue(con)).grid
+        predicates.append(
+            Predicate(
+                "distance",
+                100,
+                lambda id: grid.distance_km(id, latitude, longitude) <= radiusFilter,
+            )
         )
-    )
 
-    outlets = list(
-        filter(
-            lambda outlet: True
-            if locationFilter is None
-            else (
-                True
-                if geopy.distance.geodesic(
-                    (
-                        float(locationFilter["latitude"]),
-                        float(locationFilter["longitude"]),
-                    ),
-                    (float(outlet.location.latitude), float(outlet.location.longitude)),
-                ).km
-                <= 1
-                else False
-            ),
-            outlets,
-        )
-    )
+    return predicates
 
-    outlets = list(
-        filter(
-            lambda outlet: True
-            if landmarkFilter is None
-            else (
-                False
-                if outlet.landmark is None
-                else (True if outlet.landmark.find(landmarkFilter) != -1 else False)
-            ),
-            outlets,
-        )
-    )
 
-    outlets = list(
-        filter(
-            lambda outlet: True
-            if timeFilter is None
-            else (
-                False
-                if outlet.open_time is None or outlet.close_time is None
-                else (
-                    True
-                    if (outlet.open_time <= timeFilter)
-                    and (outlet.close_time > timeFilter)
-                    else False
-                )
-            ),
-            outlets,
+async def searchOutlets(
+    con: psycopg2.extensions.connection,
+    nameFilter: Optional[str] = None,
+    locationFilter: Optional[Location] = None,
+    landmarkFilter: Optional[str] = None,
+    timeFilter: Optional[time] = None,
+    ratingFilter: Optional[float] = None,
+    itemFilter: Optional[str] = None,
+    radiusFilter: float = 1,
+    minPriceFilter: Optional[int] = None,
+    maxPriceFilter: Optional[int] = None,
+    maxCalFilter: Optional[int] = None,
+    sortBy: Optional[Literal["price"]] = None,
+) -> List:
+    # With a location, only outlets in grid cells overlapping the search
+    # circle can match, so they seed the search instead of every outlet.
+    candidates = None
+    if locationFilter is not None:
+        latitude, longitude = parse_search_location(locationFilter)
+        grid = (await get_outlet_catalogue(con)).grid
+        candidates = sorted(grid.candidates(latitude, longitude, radiusFilter))
+
+    sql_filters = (nameFilter, landmarkFilter, ratingFilter)
+    if candidates is not None and (
+        len(candidates) == 0 or all(value is None for value in sql_filters)
+    ):
+        ids = candidates
+    else:
+        query, params = build_outlet_search_query(
+            nameFilter=nameFilter,
+            landmarkFilter=landmarkFilter,
+            ratingFilter=ratingFilter,
+            idsFilter=candidates,
         )
-    )
-
-    outlets = list(
-        filter(
-            lambda outlet: True
-            if ratingFilter is None
-            else (
-                False
-                if outlet.rating is None
-                else (True if outlet.rating >= ratingFilter else False)
-            ),
-            outlets,
+        ids = [row[0] for row in await fetchall(con, query, tuple(params))]
+
+    pipeline = PredicatePipeline(
+        await build_outlet_search_predicates(
+            con,
+            locationFilter=locationFilter,
+            timeFilter=timeFilter,
+            itemFilter=itemFilter,
+            radiusFilter=radiusFilter,
+            minPriceFilter=minPriceFilter,
+            maxPriceFilter=maxPriceFilter,
+            maxCalFilter=maxCalFilter,
         )
     )
-
-    outlets = list(
-        filter(
-            lambda outlet: True
-            if itemFilter is None
-            else (
-                False
-                if outlet.menu is None
-                else (
-                    True
-                    if [-1 for _ in range(len(outlet.menu))]
-                    != [item.name.find(itemFilter) for item in outlet.menu]
-                    else False
-                )
-            ),
-            outlets,
+    ids = list(pipeline.filter(ids))
+
+    if sortBy == "price":
+        # Outlets are ranked by their cheapest item among those matching the
+        # item filters; outlets with no priced item go last.
+        item_index = await get_item_index(con)
+        cheapest = item_index.cheapest_by_outlet(
+            item_index.filter_items(
+                itemFilter, minPriceFilter, maxPriceFilter, maxCalFilter
+            )
         )
-    )
+        ids.sort(key=lambda id: (id not in cheapest, cheapest.get(id, 0)))
 
-    return outlets
+    return await get_food_outlets(con, ids)
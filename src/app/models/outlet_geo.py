@@ -0,0 +1,73 @@
+from math import cos, radians
+import geopy.distance
+import numpy as np
+
+
+# Mean radius of the earth, as used by the haversine prefilter.
+EARTH_RADIUS_KM = 6371.0088
+
+# Haversine distances on a sphere differ from geodesic ones on the WGS-84
+# ellipsoid by at most about 0.5%. Everything within this relative margin of
+# the k-th haversine distance is re-ranked, so no outlet of the geodesic top k
+# can be missed.
+RERANK_MARGIN = 0.02
+
+
+def geodesic_km(latitude: float, longitude: float, point: tuple[float, float]) -> float:
+    return geopy.distance.geodesic((latitude, longitude), point).km
+
+
+class NearestIndex:
+    """
+    Keeps outlet coordinates in NumPy arrays so that the distance to every
+    outlet is computed in one vectorized haversine pass. The few outlets that
+    can be among the k nearest are then ranked by geodesic distance, the same
+    distance radius searches use.
+    """
+
+    def __init__(self, points: dict[int, tuple[float, float]]) -> None:
+        self.points = points
+        self.ids = np.fromiter(points.keys(), dtype=np.int64, count=len(points))
+        coordinates = np.radians(
+            np.array(list(points.values()), dtype=np.float64).reshape(-1, 2)
+        )
+        self.latitudes = coordinates[:, 0]
+        self.longitudes = coordinates[:, 1]
+        self.cos_latitudes = np.cos(self.latitudes)
+
+    def distances(self, latitude: float, longitude: float) -> np.ndarray:
+        latitude = radians(latitude)
+        longitude = radians(longitude)
+
+        a = (
+            np.sin((self.latitudes - latitude) / 2) ** 2
+            + cos(latitude)
+            * self.cos_latitudes
+            * np.sin((self.longitudes - longitude) / 2) ** 2
+        )
+
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def nearest(
+        self, latitude: float, longitude: float, k: int
+    ) -> list[tuple[int, float]]:
+        """
+        Returns up to `k` (id, geodesic distance in km) pairs, closest first.
+        """
+        if len(self.ids) == 0 or k <= 0:
+            return []
+
+        distances = self.distances(latitude, longitude)
+
+        if k < len(distances):
+            kth = distances[np.argpartition(distances, k - 1)[k - 1]]
+            candidates = np.flatnonzero(distances <= kth * (1 + RERANK_MARGIN))
+        else:
+            candidates = np.arange(len(distances))
+
+        ranked = sorted(
+            (geodesic_km(latitude, longitude, self.points[id]), id)
+            for id in self.ids[candidates].tolist()
+        )
+
+        return [(id, distance) for distance, id in ranked[:k]]
@@ -0,0 +1,479 @@
+from app.db import fetchall
+from app.models.outlet_geo import NearestIndex, geodesic_km
+from app.utils.ttl_cache import TTLCache
+from bisect import bisect_left, bisect_right, insort
+from datetime import time
+from math import cos, floor, inf, radians
+import psycopg2.extensions
+from config import api_config
+
+
+# Side of a grid cell in degrees, roughly 1.1 km of latitude.
+CELL_SIZE = 0.01
+
+KM_PER_DEGREE_LATITUDE = 111.32
+
+
+def parse_coordinates(location: dict | None) -> tuple[float, float] | None:
+    if location is None:
+        return None
+
+    try:
+        return float(location["latitude"]), float(location["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class GridIndex:
+    """
+    Buckets points into CELL_SIZE x CELL_SIZE degree cells. A radius query
+    only looks at the cells overlapping the bounding box of the circle and then
+    checks the exact geodesic distance of the points in them.
+    """
+
+    def __init__(self, points: dict[int, tuple[float, float]]) -> None:
+        self.points = points
+        self.cells: dict[tuple[int, int], list[int]] = {}
+
+        for id, (latitude, longitude) in points.items():
+            self.cells.setdefault(self._cell(latitude, longitude), []).append(id)
+
+    @staticmethod
+    def _cell(latitude: float, longitude: float) -> tuple[int, int]:
+        return floor(latitude / CELL_SIZE), floor(longitude / CELL_SIZE)
+
+    def cell_bounds(
+        self, latitude: float, longitude: float, radius_km: float
+    ) -> tuple[tuple[int, int], tuple[int, int]]:
+        """
+        Returns the first and last cell of the block of cells overlapping the
+        bounding box of the circle.
+        """
+        latitude_span = radius_km / KM_PER_DEGREE_LATITUDE
+        # Near the poles a degree of longitude shrinks to nothing, so the span
+        # is capped at the whole globe.
+        longitude_scale = KM_PER_DEGREE_LATITUDE * cos(radians(latitude))
+        longitude_span = (
+            radius_km / longitude_scale if longitude_scale > 1e-9 else 360.0
+        )
+        longitude_span = min(longitude_span, 360.0)
+
+        min_row, min_column = self._cell(
+            latitude - latitude_span, longitude - longitude_span
+        )
+        max_row, max_column = self._cell(
+            latitude + latitude_span, longitude + longitude_span
+        )
+
+        return (min_row, min_column), (max_row, max_column)
+
+    def candidates(
+        self, latitude: float, longitude: float, radius_km: float
+    ) -> list[int]:
+        """
+        Returns the ids of the points in cells overlapping the bounding box of
+        the circle, in no particular order.
+        """
+        (min_row, min_column), (max_row, max_column) = self.cell_bounds(
+            latitude, longitude, radius_km
+        )
+
+        ids = []
+        if (max_row - min_row + 1) * (max_column - min_column + 1) > len(self.cells):
+            # A wide circle covers more cells than are occupied, so walk the
+            # occupied ones instead.
+            for (row, column), cell_ids in self.cells.items():
+                if min_row <= row <= max_row and min_column <= column <= max_column:
+                    ids.extend(cell_ids)
+            return ids
+
+        for row in range(min_row, max_row + 1):
+            for column in range(min_column, max_column + 1):
+                ids.extend(self.cells.get((row, column), []))
+
+        return ids
+
+    def distance_km(self, id: int, latitude: float, longitude: float) -> float:
+        return geodesic_km(latitude, longitude, self.points[id])
+
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def seconds_of_day(value: time) -> int:
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+class OpenIndex:
+    """
+    Answers "which outlets are open at time t" with a stabbing query. The day
+    is cut at every opening and closing time into segments that each carry the
+    set of outlets open throughout them, so a lookup is one binary search.
+
+    Hours that close at or before they open run past midnight and are split
+    into an evening and a morning interval. Equal opening and closing times
+    mean open all day.
+    """
+
+    def __init__(self, hours: dict[int, tuple[time, time]]) -> None:
+        intervals: list[tuple[int, int, int]] = []
+        for id, (open_time, close_time) in hours.items():
+            start = seconds_of_day(open_time)
+            end = seconds_of_day(close_time)
+
+            if start < end:
+                intervals.append((start, end, id))
+            elif start > end:
+                intervals.append((start, SECONDS_PER_DAY, id))
+                if end > 0:
+                    intervals.append((0, end, id))
+            else:
+                intervals.append((0, SECONDS_PER_DAY, id))
+
+        self.breakpoints = sorted(
+            {0}
+            | {start for start, _, _ in intervals}
+            | {end for _, end, _ in intervals}
+        )
+        self.segments: list[frozenset[int]] = []
+
+        starts: dict[int, list[int]] = {}
+        ends: dict[int, list[int]] = {}
+        for start, end, id in intervals:
+            starts.setdefault(start, []).append(id)
+            ends.setdefault(end, []).append(id)
+
+        # Sweep the breakpoints in order, keeping a count per outlet since the
+        # two halves of an overnight window may touch at midnight.
+        open_counts: dict[int, int] = {}
+        for breakpoint in self.breakpoints:
+            for id in ends.get(breakpoint, []):
+                open_counts[id] -= 1
+                if open_counts[id] == 0:
+                    del open_counts[id]
+            for id in starts.get(breakpoint, []):
+                open_counts[id] = open_counts.get(id, 0) + 1
+
+            self.segments.append(frozenset(open_counts))
+
+    def open_at(self, at: time) -> frozenset[int]:
+        index = bisect_right(self.breakpoints, seconds_of_day(at)) - 1
+        return self.segments[index]
+
+
+class OutletCatalogue:
+    """
+    An in-memory snapshot of the outlet data that searches need, built from a
+    single query.
+    """
+
+    def __init__(self, rows: list[tuple]) -> None:
+        self.ids = [row[0] for row in rows]
+        self.names: dict[int, str] = {}
+        self.hours: dict[int, tuple[time, time]] = {}
+
+        points = {}
+        for id, name, location, open_time, close_time in rows:
+            self.names[id] = name
+
+            coordinates = parse_coordinates(location)
+            if coordinates is not None:
+                points[id] = coordinates
+
+            if open_time is not None and close_time is not None:
+                self.hours[id] = (open_time, close_time)
+
+        self.grid = GridIndex(points)
+        self.ranking = NearestIndex(points)
+        self.open = OpenIndex(self.hours)
+
+
+# Rebuilt lazily on the first read after any outlet or menu item write. The
+# generation counter keeps a build that raced with a write from being
+# installed.
+_catalogue: OutletCatalogue | None = None
+_generation = 0
+
+# Serialized results of query-string searches, keyed by their normalized
+# parameters. Every outlet or menu item write goes through
+# invalidate_outlet_catalogue, which flushes it.
+search_cache = TTLCache(
+    ttl=api_config["search-cache-ttl"],
+    max_entries=api_config["search-cache-max-entries"],
+)
+
+
+def invalidate_outlet_catalogue() -> None:
+    global _catalogue, _generation
+
+    _catalogue = None
+    _generation += 1
+    search_cache.clear()
+
+
+async def get_outlet_catalogue(
+    con: psycopg2.extensions.connection,
+) -> OutletCatalogue:
+    global _catalogue
+
+    if _catalogue is not None:
+        return _catalogue
+
+    generation = _generation
+    result = await fetchall(
+        con,
+        "SELECT id, name, location, open_time, close_time FROM food_outlets ORDER BY id",
+    )
+    catalogue = OutletCatalogue(result)
+
+    if generation == _generation:
+        _catalogue = catalogue
+
+    return catalogue
+
+
+# Names are indexed by every substring of up to MAX_GRAM characters, so a query
+# that short is answered exactly by a single posting list. Longer queries
+# intersect the postings of their trigrams and then confirm the substring.
+MAX_GRAM = 3
+
+
+def name_grams(name: str) -> set[str]:
+    return {
+        name[start : start + size]
+        for size in range(1, MAX_GRAM + 1)
+        for start in range(len(name) - size + 1)
+    }
+
+
+class SortedKeyIndex:
+    """
+    Item ids kept sorted by a numeric key, so that a range query is two binary
+    searches plus a slice the size of the result.
+    """
+
+    def __init__(self) -> None:
+        self.entries: list[tuple[int, int]] = []
+
+    def add(self, key: int, id: int) -> None:
+        insort(self.entries, (key, id))
+
+    def remove(self, key: int, id: int) -> None:
+        index = bisect_left(self.entries, (key, id))
+        if index < len(self.entries) and self.entries[index] == (key, id):
+            del self.entries[index]
+
+    def range(self, low: int | None = None, high: int | None = None) -> list[int]:
+        """
+        Returns the ids with low <= key <= high in key order.
+        """
+        start = 0 if low is None else bisect_left(self.entries, (low, -inf))
+        end = (
+            len(self.entries)
+            if high is None
+            else bisect_right(self.entries, (high, inf))
+        )
+
+        return [id for _, id in self.entries[start:end]]
+
+
+class ItemIndex:
+    """
+    In-memory indexes over menu items: an inverted index from n-grams of their
+    names to item ids, for substring ("who sells paneer") lookups, and sorted
+    price and calorie arrays for range filters.
+    """
+
+    def __init__(self, rows: list[tuple]) -> None:
+        self.items: dict[int, tuple[str, int, int | None, int | None]] = {}
+        self.postings: dict[str, set[int]] = {}
+        self.prices = SortedKeyIndex()
+        self.calories = SortedKeyIndex()
+
+        for id, name, outlet_id, price, cal in rows:
+            self.add(id, name, outlet_id, price, cal)
+
+    def add(
+        self,
+        id: int,
+        name: str | None,
+        outlet_id: int | None,
+        price: int | None,
+        cal: int | None,
+    ) -> None:
+        if name is None or outlet_id is None:
+            return
+
+        name = name.lower()
+        price = int(price) if price is not None else None
+        self.items[id] = (name, outlet_id, price, cal)
+        for gram in name_grams(name):
+            self.postings.setdefault(gram, set()).add(id)
+        if price is not None:
+            self.prices.add(price, id)
+        if cal is not None:
+            self.calories.add(cal, id)
+
+    def remove(self, id: int) -> None:
+        if id not in self.items:
+            return
+
+        name, _, price, cal = self.items.pop(id)
+        for gram in name_grams(name):
+            posting = self.postings[gram]
+            posting.discard(id)
+            if len(posting) == 0:
+                del self.postings[gram]
+        if price is not None:
+            self.prices.remove(price, id)
+        if cal is not None:
+            self.calories.remove(cal, id)
+
+    def update(
+        self,
+        id: int,
+        name: str | None,
+        outlet_id: int | None,
+        price: int | None,
+        cal: int | None,
+    ) -> None:
+        self.remove(id)
+        self.add(id, name, outlet_id, price, cal)
+
+    def remove_outlet(self, outlet_id: int) -> None:
+        for id in [id for id, item in self.items.items() if item[1] == outlet_id]:
+            self.remove(id)
+
+    def search_items(self, query: str) -> set[int]:
+        query = query.lower()
+        if query == "":
+            return set(self.items)
+
+        if len(query) <= MAX_GRAM:
+            return set(self.postings.get(query, ()))
+
+        postings = sorted(
+            (
+                self.postings.get(query[start : start + MAX_GRAM], set())
+                for start in range(len(query) - MAX_GRAM + 1)
+            ),
+            key=len,
+        )
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if len(candidates) == 0:
+                break
+            candidates &= posting
+
+        return {id for id in candidates if query in self.items[id][0]}
+
+    def outlets_of(self, ids: list[int] | set[int]) -> set[int]:
+        return {self.items[id][1] for id in ids}
+
+    def filter_items(
+        self,
+        query: str | None = None,
+        min_price: int | None = None,
+        max_price: int | None = None,
+        max_cal: int | None = None,
+    ) -> list[int]:
+        """
+        Returns the ids of items matching every given filter, ordered by price
+        when a price bound is given and by id otherwise.
+        """
+        ids: list[int] | None = None
+        if min_price is not None or max_price is not None:
+            ids = self.prices.range(min_price, max_price)
+
+        restrictions = []
+        if max_cal is not None:
+            restrictions.append(set(self.calories.range(None, max_cal)))
+        if query is not None:
+            restrictions.append(self.search_items(query))
+
+        if ids is None:
+            if len(restrictions) == 0:
+                return sorted(self.items)
+
+            restrictions.sort(key=len)
+            ids = sorted(restrictions.pop(0))
+
+        for restriction in restrictions:
+            ids = [id for id in ids if id in restriction]
+
+        return ids
+
+    def by_price(self, ids: list[int]) -> list[int]:
+        """
+        Orders `ids` by price, cheapest first, with unpriced items last.
+        """
+        return sorted(
+            ids,
+            key=lambda id: (self.items[id][2] is None, self.items[id][2] or 0, id),
+        )
+
+    def cheapest_by_outlet(self, ids: list[int]) -> dict[int, int]:
+        cheapest: dict[int, int] = {}
+        for id in ids:
+            _, outlet_id, price, _ = self.items[id]
+            if price is not None and (
+                outlet_id not in cheapest or price < cheapest[outlet_id]
+            ):
+                cheapest[outlet_id] = price
+
+        return cheapest
+
+
+# Unlike the catalogue, the item index is kept up to date in place by menu item
+# writes. A write that lands while the index is being built discards that
+# build, and the next read starts over.
+_item_index: ItemIndex | None = None
+_item_index_generation = 0
+
+
+def update_item_index(
+    id: int,
+    name: str | None,
+    outlet_id: int | None,
+    price: int | None,
+    cal: int | None,
+) -> None:
+    global _item_index_generation
+
+    _item_index_generation += 1
+    if _item_index is not None:
+        _item_index.update(id, name, outlet_id, price, cal)
+
+
+def remove_from_item_index(id: int) -> None:
+    global _item_index_generation
+
+    _item_index_generation += 1
+    if _item_index is not None:
+        _item_index.remove(id)
+
+
+def remove_outlet_from_item_index(outlet_id: int) -> None:
+    global _item_index_generation
+
+    _item_index_generation += 1
+    if _item_index is not None:
+        _item_index.remove_outlet(outlet_id)
+
+
+async def get_item_index(con: psycopg2.extensions.connection) -> ItemIndex:
+    global _item_index
+
+    if _item_index is not None:
+        return _item_index
+
+    generation = _item_index_generation
+    result = await fetchall(
+        con, "SELECT id, name, food_outlet_id, price, cal FROM food_outlet_menu_items"
+    )
+    index = ItemIndex(result)
+
+    if generation == _item_index_generation:
+        _item_index = index
+
+    return index
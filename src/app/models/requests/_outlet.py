@@ -1,6 +1,6 @@
 from typing import Optional, Literal
 from datetime import time
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from app.models.requests.globals import LocationRequestModel
 
 
@@ -51,3 +51,8 @@ class FilterFoodOutletBodyParams(BaseModel):
     current_time: Optional[time] = None
     rating: Optional[float] = None
     food_item: Optional[str] = None
+    radius_km: float = Field(default=1, gt=0)
+    min_price: Optional[int] = Field(default=None, ge=0)
+    max_price: Optional[int] = Field(default=None, ge=0)
+    max_cal: Optional[int] = Field(default=None, ge=0)
+    sort: Optional[Literal["price"]] = None
@@ -59,6 +59,19 @@ class GetBusStopResponseModel_ERR_404(BaseModel):
     detail: Literal["Bus Stop Not Found"]
 
 
+class BusDepartureResponseModel(BaseModel):
+    departure_time: str
+    next_day: bool
+    schedule_id: int
+    route_id: int
+    route_name: str
+    destination: Union[str, None]
+
+
+class GetBusStopDeparturesResponseModel(BaseModel):
+    departures: List[BusDepartureResponseModel]
+
+
 class NewBusStopResponseModel(BaseModel):
     id: int
     name: str
@@ -105,6 +118,10 @@ class GetBusRouteResponseModel_ERR_404(BaseModel):
     detail: Literal["Bus Route Not Found"]
 
 
+class GetBusRouteDeparturesResponseModel(BaseModel):
+    departures: List[BusDepartureResponseModel]
+
+
 class NewBusRouteResponseModel(BaseModel):
     id: int
     name: str
@@ -201,3 +218,35 @@ class UpdateBusScheduleResponseModel_ERR_400(BaseModel):
 
 class DeleteBusScheduleResponseModel_ERR_404(BaseModel):
     detail: Literal["Bus Schedule Not Found"]
+
+
+class JourneyLegResponseModel(BaseModel):
+    schedule_id: int
+    route_id: int
+    route_name: str
+    from_stop: BusStopResponseModel
+    to_stop: BusStopResponseModel
+    departure_time: str
+    departure_day_offset: int
+    arrival_time: str
+    arrival_day_offset: int
+
+
+class JourneyResponseModel(BaseModel):
+    departure_time: Union[str, None]
+    departure_day_offset: int
+    arrival_time: str
+    arrival_day_offset: int
+    legs: List[JourneyLegResponseModel]
+
+
+class GetBusJourneyResponseModel(BaseModel):
+    journey: JourneyResponseModel
+
+
+class GetBusJourneyResponseModel_ERR_404_BusStopNotFound(BaseModel):
+    detail: Literal["Bus Stop Not Found"]
+
+
+class GetBusJourneyResponseModel_ERR_404_NoJourneyFound(BaseModel):
+    detail: Literal["No Journey Found"]
@@ -103,8 +103,32 @@ class GetCurrentMessMenuDetailsByDayResponseModel_ERR_404(BaseModel):
     detail: Literal["Mess not found"]
 
 
+class GetCurrentMessMenuDetailsByMealResponseModel(BaseModel):
+    menu: list[MenuItemResponseModel] | None
+
+
+class GetCurrentMessMenuDetailsByMealResponseModel_ERR_404(BaseModel):
+    detail: Literal["Mess not found"]
+
+
+class MessNowResponseModel(BaseModel):
+    mess_id: int
+    mess_name: str
+    day: str
+    meal: str
+    start: str
+    end: str
+    serving: bool
+    items: Optional[list[MenuItemResponseModel]]
+
+
+class GetMessNowResponseModel(BaseModel):
+    messes: list[MessNowResponseModel]
+
+
 class GetMessMenuDetailsResponseModel(BaseModel):
     menus: list[MessMenuResponseModel]
+    next_after_id: Optional[int]
 
 
 class GetMessMenuDetailsByIDsResponseModel(BaseModel):
@@ -123,6 +147,10 @@ class CreateMessMenuResponseModel_ERR_400(BaseModel):
     detail: Literal["Mess menu already exists"]
 
 
+class CreateMessMenuResponseModel_ERR_404(BaseModel):
+    detail: str
+
+
 class UpdateMessMenuResponseModel(BaseModel):
     menu: MessMenuResponseModel
 
@@ -131,6 +159,10 @@ class UpdateMessMenuResponseModel_ERR_404(BaseModel):
     detail: Literal["Mess menu not found"]
 
 
+class UpdateMessMenuResponseModel_ERR_404_MessMenuItemsNotFound(BaseModel):
+    detail: str
+
+
 class DeleteMessMenuResponseModel_ERR_404(BaseModel):
     detail: Literal["Mess menu not found"]
 
@@ -31,6 +31,25 @@ class GetAllFoodOutletDetailsResponseModel(BaseModel):
     outlets: list[OutletResponseModel]
 
 
+class NearestOutletResponseModel(OutletResponseModel):
+    distance_km: float
+
+
+class GetNearestFoodOutletsResponseModel(BaseModel):
+    outlets: list[NearestOutletResponseModel]
+
+
+class OpenOutletResponseModel(BaseModel):
+    id: int
+    name: str
+    open_time: str
+    close_time: str
+
+
+class GetOpenFoodOutletsResponseModel(BaseModel):
+    outlets: list[OpenOutletResponseModel]
+
+
 class GetFoodOutletDetailsResponseModel(BaseModel):
     outlet: OutletResponseModel
 
@@ -47,6 +66,22 @@ class FilterFoodOutletsResponseModel_ERR_404(BaseModel):
     detail: Literal["No food outlets found"]
 
 
+class FilterFoodOutletsResponseModel_ERR_400(BaseModel):
+    detail: Literal["Invalid location"]
+
+
+class SearchPredicateStatsResponseModel(BaseModel):
+    name: str
+    cost: int
+    evaluated: int
+    passed: int
+    seconds: float
+
+
+class GetSearchPredicateStatsResponseModel(BaseModel):
+    predicates: list[SearchPredicateStatsResponseModel]
+
+
 class CreateFoodOutletResponseModel(BaseModel):
     outlet: OutletResponseModel
 
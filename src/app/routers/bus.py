@@ -1,24 +1,37 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from app.db import connect, disconnect
+from fastapi import APIRouter, HTTPException, Query, status, Depends
+from app.db import get_db
+from psycopg2.extensions import connection
+
+# Some endpoints below share their name with the model function they call, so
+# those model functions are imported under another name.
 from app.models.bus import (
     create_bus_route,
     create_bus_schedule,
     create_bus_stop,
     create_bus_type,
     get_bus_route_by_id,
-    get_bus_routes,
     get_bus_schedule_by_id,
-    get_bus_schedules,
     get_bus_stop_by_id,
-    get_bus_stops,
     get_bus_type_by_id,
-    get_bus_types,
     remove_bus_route,
     remove_bus_schedule,
+    remove_bus_stop as delete_bus_stop,
+    remove_bus_type as delete_bus_type,
     update_bus_route,
     update_bus_schedule,
+    update_bus_stop as modify_bus_stop,
     update_bus_type,
 )
+from app.models.bus_journey import MINUTES_PER_DAY
+from app.models.bus_timetable import (
+    BusTimetable,
+    DepartureIndex,
+    get_bus_timetable,
+    minute_of_day,
+)
+from config import api_config
+from datetime import datetime, time
+from zoneinfo import ZoneInfo
 from app.models.globals import Location
 from app.utils.globals import obj_to_json
 from fastapi.security.api_key import APIKey
@@ -35,6 +48,7 @@ from app.models.responses._bus import (
     GetAllBusStopsResponseModel,
     GetBusStopResponseModel,
     GetBusStopResponseModel_ERR_404,
+    GetBusStopDeparturesResponseModel,
     NewBusStopResponseModel,
     NewBusStopResponseModel_ERR_400,
     UpdateBusStopResponseModel,
@@ -43,6 +57,7 @@ from app.models.responses._bus import (
     GetAllBusRoutesResponseModel,
     GetBusRouteResponseModel,
     GetBusRouteResponseModel_ERR_404,
+    GetBusRouteDeparturesResponseModel,
     NewBusRouteResponseModel,
     NewBusRouteResponseModel_ERR_400,
     NewBusRouteResponseModel_ERR_404,
@@ -59,6 +74,9 @@ from app.models.responses._bus import (
     UpdateBusScheduleResponseModel_ERR_404,
     UpdateBusScheduleResponseModel_ERR_400,
     DeleteBusScheduleResponseModel_ERR_404,
+    GetBusJourneyResponseModel,
+    GetBusJourneyResponseModel_ERR_404_BusStopNotFound,
+    GetBusJourneyResponseModel_ERR_404_NoJourneyFound,
 )
 from app.models.requests._bus import (
     NewBusTypeBodyParams,
@@ -74,21 +92,55 @@ from app.models.requests._bus import (
 router = APIRouter()
 
 
+def _format_minute(minute: int) -> str:
+    minute %= MINUTES_PER_DAY
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def _departures_json(
+    timetable: BusTimetable, index: DepartureIndex | None, after: time, limit: int
+) -> list[dict]:
+    if index is None:
+        return []
+
+    departures = []
+    for minute, schedule_id, next_day in index.next(minute_of_day(after), limit):
+        route = timetable.schedules[schedule_id].route
+        departures.append(
+            {
+                "departure_time": _format_minute(minute),
+                "next_day": next_day,
+                "schedule_id": schedule_id,
+                "route_id": route.id,
+                "route_name": route.name,
+                "destination": (
+                    route.to_stop.name if route.to_stop is not None else None
+                ),
+            }
+        )
+
+    return departures
+
+
+def _parse_time(value: str | None) -> time | None:
+    # Raises ValueError for anything that is not HH:MM or HH:MM:SS.
+    if value is None:
+        return None
+
+    return time.fromisoformat(value)
+
+
 @router.get(
     "/bus_type",
     summary="Get Details of All Bus Types",
     tags=["bus"],
     response_model=GetAllBusTypesResponseModel,
 )
-async def get_all_bus_types():
-    con = connect()
-
-    bus_types = await get_bus_types(con)
+async def get_all_bus_types(con: connection = Depends(get_db)):
+    bus_types = list((await get_bus_timetable(con)).types.values())
     types_json = obj_to_json(bus_types)
 
-    disconnect(con)
-
-    return {"bus_types": types_json}
+    return {"types": types_json}
 
 
 @router.get(
@@ -103,21 +155,16 @@ async def get_all_bus_types():
         }
     },
 )
-async def get_bus_type(id: int):
-    con = connect()
-
-    bus_type = await get_bus_type_by_id(con, id)
+async def get_bus_type(id: int, con: connection = Depends(get_db)):
+    bus_type = (await get_bus_timetable(con)).types.get(id)
 
     if bus_type is None:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Bus Type Not Found"
         )
 
     type_json = obj_to_json(bus_type)
 
-    disconnect(con)
-
     return {"type": type_json}
 
 
@@ -135,22 +182,19 @@ async def get_bus_type(id: int):
     },
 )
 async def add_bus_type(
-    params: NewBusTypeBodyParams, api_key: APIKey = Depends(get_api_key)
+    params: NewBusTypeBodyParams,
+    api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
-
     bus_type = await create_bus_type(con, params.name)
 
     if bus_type is None:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Bus Type Already Exists"
         )
 
     type_json = obj_to_json(bus_type)
 
-    disconnect(con)
-
     return {"type": type_json}
 
 
@@ -167,25 +211,23 @@ async def add_bus_type(
     },
 )
 async def modify_bus_type(
-    id: int, params: UpdateBusTypeBodyParams, api_key: APIKey = Depends(get_api_key)
+    id: int,
+    params: UpdateBusTypeBodyParams,
+    api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
-
     bus_type = await get_bus_type_by_id(con, id)
 
     if bus_type is None:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Bus Type Not Found"
         )
 
     bus_type.name = params.name
-    new_type = update_bus_type(con, bus_type)
+    new_type = await update_bus_type(con, bus_type)
 
     type_json = obj_to_json(new_type)
 
-    disconnect(con)
-
     return {"type": type_json}
 
 
@@ -201,20 +243,17 @@ async def modify_bus_type(
         }
     },
 )
-async def remove_bus_type(id: int, api_key: APIKey = Depends(get_api_key)):
-    con = connect()
-
+async def remove_bus_type(
+    id: int, api_key: APIKey = Depends(get_api_key), con: connection = Depends(get_db)
+):
     bus_type = await get_bus_type_by_id(con, id)
 
     if bus_type is None:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Bus Type Not Found"
         )
 
-    remove_bus_type(con, bus_type)
-
-    disconnect(con)
+    await delete_bus_type(con, bus_type)
 
 
 @router.get(
@@ -223,14 +262,10 @@ async def remove_bus_type(id: int, api_key: APIKey = Depends(get_api_key)):
     tags=["bus"],
     response_model=GetAllBusStopsResponseModel,
 )
-async def get_all_bus_stops():
-    con = connect()
-
-    bus_stops = await get_bus_stops(con)
+async def get_all_bus_stops(con: connection = Depends(get_db)):
+    bus_stops = list((await get_bus_timetable(con)).stops.values())
     stops_json = obj_to_json(bus_stops)
 
-    disconnect(con)
-
     return {"stops": stops_json}
 
 
@@ -246,24 +281,54 @@ async def get_all_bus_stops():
         }
     },
 )
-async def get_bus_stop(id: int):
-    con = connect()
-
-    bus_stop = await get_bus_stop_by_id(con, id)
+async def get_bus_stop(id: int, con: connection = Depends(get_db)):
+    bus_stop = (await get_bus_timetable(con)).stops.get(id)
 
     if bus_stop is None:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Bus Stop Not Found"
         )
 
     stop_json = obj_to_json(bus_stop)
 
-    disconnect(con)
-
     return {"stop": stop_json}
 
 
+@router.get(
+    "/bus_stop/{id}/departures",
+    summary="Get the Next Departures from a Bus Stop (default: from now)",
+    tags=["bus"],
+    response_model=GetBusStopDeparturesResponseModel,
+    responses={
+        status.HTTP_404_NOT_FOUND: {
+            "description": "Not Found Error",
+            "model": GetBusStopResponseModel_ERR_404,
+        }
+    },
+)
+async def get_bus_stop_departures(
+    id: int,
+    after: time | None = None,
+    limit: int = Query(5, ge=1, le=50),
+    con: connection = Depends(get_db),
+):
+    timetable = await get_bus_timetable(con)
+
+    if id not in timetable.stops:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Bus Stop Not Found"
+        )
+
+    if after is None:
+        after = datetime.now(ZoneInfo(api_config["timezone"])).time()
+
+    departures = _departures_json(
+        timetable, timetable.stop_departures.get(id), after, limit
+    )
+
+    return {"departures": departures}
+
+
 @router.post(
     "/bus_stop",
     status_code=status.HTTP_201_CREATED,
@@ -278,10 +343,10 @@ async def get_bus_stop(id: int):
     },
 )
 async def add_bus_stop(
-    params: NewBusStopBodyParams, api_key: APIKey = Depends(get_api_key)
+    params: NewBusStopBodyParams,
+    api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
-
     stop = await create_bus_stop(
         con,
         params.name,
@@ -294,15 +359,12 @@ async def add_bus_stop(
     )
 
     if stop is None:
-        disconnect(con)
         raise HTTPException(
             status.HTTP_400_BAD_REQUEST, detail="Bus Stop Already Exists"
         )
 
     stop_json = obj_to_json(stop)
 
-    disconnect(con)
-
     return {"stop": stop_json}
 
 
@@ -319,14 +381,14 @@ async def add_bus_stop(
     },
 )
 async def update_bus_stop(
-    id: int, params: UpdateBusStopBodyParams, api_key: APIKey = Depends(get_api_key)
+    id: int,
+    params: UpdateBusStopBodyParams,
+    api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
-
     stop = await get_bus_stop_by_id(con, id)
 
     if stop is None:
-        disconnect(con)
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Bus Stop Not Found")
 
     stop.name = params.name
@@ -337,12 +399,10 @@ async def update_bus_stop(
     )
     stop.landmark = params.landmark
 
-    new_stop = update_bus_stop(con, stop)
+    new_stop = await modify_bus_stop(con, stop)
 
     stop_json = obj_to_json(new_stop)
 
-    disconnect(con)
-
     return {"stop": stop_json}
 
 
@@ -358,18 +418,15 @@ async def update_bus_stop(
         }
     },
 )
-async def remove_bus_stop(id: int, api_key: APIKey = Depends(get_api_key)):
-    con = connect()
-
+async def remove_bus_stop(
+    id: int, api_key: APIKey = Depends(get_api_key), con: connection = Depends(get_db)
+):
     stop = await get_bus_stop_by_id(con, id)
 
     if stop is None:
-        disconnect(con)
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Bus Stop Not Found")
 
-    remove_bus_stop(con, stop)
-
-    disconnect(con)
+    await delete_bus_stop(con, stop)
 
 
 @router.get(
@@ -378,14 +435,10 @@ async def remove_bus_stop(id: int, api_key: APIKey = Depends(get_api_key)):
     tags=["bus"],
     response_model=GetAllBusRoutesResponseModel,
 )
-async def get_all_bus_routes():
-    con = connect()
-
-    routes = await get_bus_routes(con)
+async def get_all_bus_routes(con: connection = Depends(get_db)):
+    routes = list((await get_bus_timetable(con)).routes.values())
     routes_json = obj_to_json(routes)
 
-    disconnect(con)
-
     return {"routes": routes_json}
 
 
@@ -401,24 +454,54 @@ async def get_all_bus_routes():
         }
     },
 )
-async def get_bus_route(id: int):
-    con = connect()
-
-    route = await get_bus_route_by_id(con, id)
+async def get_bus_route(id: int, con: connection = Depends(get_db)):
+    route = (await get_bus_timetable(con)).routes.get(id)
 
     if route is None:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Bus Route Not Found"
         )
 
     route_json = obj_to_json(route)
 
-    disconnect(con)
-
     return {"route": route_json}
 
 
+@router.get(
+    "/bus_route/{id}/departures",
+    summary="Get the Next Departures of a Bus Route (default: from now)",
+    tags=["bus"],
+    response_model=GetBusRouteDeparturesResponseModel,
+    responses={
+        status.HTTP_404_NOT_FOUND: {
+            "description": "Not Found Error",
+            "model": GetBusRouteResponseModel_ERR_404,
+        }
+    },
+)
+async def get_bus_route_departures(
+    id: int,
+    after: time | None = None,
+    limit: int = Query(5, ge=1, le=50),
+    con: connection = Depends(get_db),
+):
+    timetable = await get_bus_timetable(con)
+
+    if id not in timetable.routes:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Bus Route Not Found"
+        )
+
+    if after is None:
+        after = datetime.now(ZoneInfo(api_config["timezone"])).time()
+
+    departures = _departures_json(
+        timetable, timetable.route_departures.get(id), after, limit
+    )
+
+    return {"departures": departures}
+
+
 @router.post(
     "/bus_route",
     status_code=status.HTTP_201_CREATED,
@@ -437,20 +520,18 @@ async def get_bus_route(id: int):
     },
 )
 async def new_bus_route(
-    params: NewBusRouteBodyParams, api_key: APIKey = Depends(get_api_key)
+    params: NewBusRouteBodyParams,
+    api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
-
     from_stop = await get_bus_stop_by_id(con, params.from_stop_id)
     if from_stop is None:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="FROM Bus Stop Not Found"
         )
 
     to_stop = await get_bus_stop_by_id(con, params.to_stop_id)
     if to_stop is None:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="TO Bus Stop Not Found"
         )
@@ -459,7 +540,6 @@ async def new_bus_route(
     for stop_id in params.via_stops:
         stop = await get_bus_stop_by_id(con, stop_id)
         if stop is None:
-            disconnect(con)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="VIA Bus Stop Not Found"
             )
@@ -467,7 +547,6 @@ async def new_bus_route(
 
     route = await create_bus_route(con, params.name, from_stop, to_stop, via_stops)
     if route is None:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Bus Route Already Exists"
         )
@@ -490,13 +569,13 @@ async def new_bus_route(
     },
 )
 async def modify_bus_route(
-    id: int, params: UpdateBusRouteBodyParams, api_key: APIKey = Depends(get_api_key)
+    id: int,
+    params: UpdateBusRouteBodyParams,
+    api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
-
     route = await get_bus_route_by_id(con, id)
     if route is None:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Bus Route Not Found"
         )
@@ -504,7 +583,6 @@ async def modify_bus_route(
     if params.from_stop_id is not None:
         from_stop = await get_bus_stop_by_id(con, params.from_stop_id)
         if from_stop is None:
-            disconnect(con)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="FROM Bus Stop Not Found"
             )
@@ -513,7 +591,6 @@ async def modify_bus_route(
     if params.to_stop_id is not None:
         to_stop = await get_bus_stop_by_id(con, params.to_stop_id)
         if to_stop is None:
-            disconnect(con)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="TO Bus Stop Not Found"
             )
@@ -524,7 +601,6 @@ async def modify_bus_route(
         for stop_id in params.via_stops:
             stop = await get_bus_stop_by_id(con, stop_id)
             if stop is None:
-                disconnect(con)
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="VIA Bus Stop Not Found",
@@ -550,19 +626,16 @@ async def modify_bus_route(
         }
     },
 )
-async def delete_bus_route(id: int, api_key: APIKey = Depends(get_api_key)):
-    con = connect()
-
+async def delete_bus_route(
+    id: int, api_key: APIKey = Depends(get_api_key), con: connection = Depends(get_db)
+):
     route = await get_bus_route_by_id(con, id)
     if route is None:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Bus Route Not Found"
         )
 
-    remove_bus_route(con, route)
-
-    disconnect(con)
+    await remove_bus_route(con, route)
 
 
 @router.get(
@@ -571,14 +644,10 @@ async def delete_bus_route(id: int, api_key: APIKey = Depends(get_api_key)):
     tags=["bus"],
     response_model=GetAllBusSchedulesResponseModel,
 )
-async def get_all_bus_schedules():
-    con = connect()
-
-    schedules = await get_bus_schedules(con)
+async def get_all_bus_schedules(con: connection = Depends(get_db)):
+    schedules = list((await get_bus_timetable(con)).schedules.values())
     schedules_json = obj_to_json(schedules)
 
-    disconnect(con)
-
     return {"schedules": schedules_json}
 
 
@@ -594,20 +663,15 @@ async def get_all_bus_schedules():
         }
     },
 )
-async def get_bus_schedule(id: int):
-    con = connect()
-
-    schedule = await get_bus_schedule_by_id(con, id)
+async def get_bus_schedule(id: int, con: connection = Depends(get_db)):
+    schedule = (await get_bus_timetable(con)).schedules.get(id)
     if schedule is None:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Bus Schedule Not Found"
         )
 
     schedule_json = obj_to_json(schedule)
 
-    disconnect(con)
-
     return {"schedule": schedule_json}
 
 
@@ -629,20 +693,18 @@ async def get_bus_schedule(id: int):
     },
 )
 async def new_bus_schedule(
-    params: NewBusScheduleBodyParams, api_key: APIKey = Depends(get_api_key)
+    params: NewBusScheduleBodyParams,
+    api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
-
     route = await get_bus_route_by_id(con, params.route_id)
     if route is None:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Bus Route Not Found"
         )
 
     bus_type = await get_bus_type_by_id(con, params.bus_type_id)
     if bus_type is None:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Bus Type Not Found"
         )
@@ -650,28 +712,28 @@ async def new_bus_schedule(
     try:
         schedule = await create_bus_schedule(
             con,
+            _parse_time(params.start_time),
             route,
             bus_type,
-            params.start_time,
-            params.end_time,
-            params.via_stops_times,
+            _parse_time(params.end_time),
+            (
+                [_parse_time(value) for value in params.via_stops_times]
+                if params.via_stops_times is not None
+                else None
+            ),
         )
     except ValueError:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid Time Format",
         )
 
     if schedule is None:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Bus Schedule Already Exists",
         )
 
-    disconnect(con)
-
     schedule_json = obj_to_json(schedule)
 
     return {"schedule": schedule_json}
@@ -694,13 +756,13 @@ async def new_bus_schedule(
     },
 )
 async def modify_bus_schedule(
-    id: int, params: UpdateBusScheduleBodyParams, api_key: APIKey = Depends(get_api_key)
+    id: int,
+    params: UpdateBusScheduleBodyParams,
+    api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
-
     schedule = await get_bus_schedule_by_id(con, id)
     if schedule is None:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Bus Schedule Not Found"
         )
@@ -708,7 +770,6 @@ async def modify_bus_schedule(
     if params.route_id is not None:
         route = await get_bus_route_by_id(con, params.route_id)
         if route is None:
-            disconnect(con)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Bus Route Not Found"
             )
@@ -717,33 +778,31 @@ async def modify_bus_schedule(
     if params.bus_type_id is not None:
         bus_type = await get_bus_type_by_id(con, params.bus_type_id)
         if bus_type is None:
-            disconnect(con)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Bus Type Not Found"
             )
         schedule.bus_type = bus_type
 
-    if params.start_time is not None:
-        schedule.start_time = params.start_time
-
-    if params.end_time is not None:
-        schedule.end_time = params.end_time
+    try:
+        if params.start_time is not None:
+            schedule.start_time = _parse_time(params.start_time)
 
-    if params.via_stops_times is not None:
-        schedule.via_stop_times = params.via_stops_times
+        if params.end_time is not None:
+            schedule.end_time = _parse_time(params.end_time)
 
-    try:
-        schedule = await update_bus_schedule(con, schedule)
+        if params.via_stops_times is not None:
+            schedule.via_stop_times = [
+                _parse_time(value) for value in params.via_stops_times
+            ]
     except ValueError:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid Time Format",
         )
 
-    schedule_json = obj_to_json(schedule)
+    schedule = await update_bus_schedule(con, schedule)
 
-    disconnect(con)
+    schedule_json = obj_to_json(schedule)
 
     return {"schedule": schedule_json}
 
@@ -760,16 +819,78 @@ async def modify_bus_schedule(
         }
     },
 )
-async def delete_bus_schedule(id: int, api_key: APIKey = Depends(get_api_key)):
-    con = connect()
-
+async def delete_bus_schedule(
+    id: int, api_key: APIKey = Depends(get_api_key), con: connection = Depends(get_db)
+):
     schedule = await get_bus_schedule_by_id(con, id)
     if schedule is None:
-        disconnect(con)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Bus Schedule Not Found"
         )
 
-    remove_bus_schedule(con, schedule)
+    await remove_bus_schedule(con, schedule)
+
+
+@router.get(
+    "/bus/journey",
+    summary="Plan the Earliest Arriving Bus Journey between two Stops",
+    tags=["bus"],
+    response_model=GetBusJourneyResponseModel,
+    responses={
+        status.HTTP_404_NOT_FOUND: {
+            "description": "Not Found Error",
+            "model": GetBusJourneyResponseModel_ERR_404_BusStopNotFound
+            | GetBusJourneyResponseModel_ERR_404_NoJourneyFound,
+        }
+    },
+)
+async def get_bus_journey(
+    from_stop: int,
+    to_stop: int,
+    depart_after: time | None = None,
+    con: connection = Depends(get_db),
+):
+    timetable = await get_bus_timetable(con)
+
+    if from_stop not in timetable.stops or to_stop not in timetable.stops:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Bus Stop Not Found"
+        )
+
+    if depart_after is None:
+        depart_after = datetime.now(ZoneInfo(api_config["timezone"])).time()
+
+    start = minute_of_day(depart_after)
+    legs = timetable.connections.earliest_arrival(from_stop, to_stop, start)
+    if legs is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="No Journey Found"
+        )
+
+    departure = legs[0].departure if len(legs) > 0 else start
+    arrival = legs[-1].arrival if len(legs) > 0 else start
+    journey = {
+        "departure_time": _format_minute(departure) if len(legs) > 0 else None,
+        "departure_day_offset": departure // MINUTES_PER_DAY,
+        "arrival_time": _format_minute(arrival),
+        "arrival_day_offset": arrival // MINUTES_PER_DAY,
+        "legs": [],
+    }
+
+    for leg in legs:
+        route = timetable.schedules[leg.schedule_id].route
+        journey["legs"].append(
+            {
+                "schedule_id": leg.schedule_id,
+                "route_id": route.id,
+                "route_name": route.name,
+                "from_stop": obj_to_json(timetable.stops[leg.from_stop]),
+                "to_stop": obj_to_json(timetable.stops[leg.to_stop]),
+                "departure_time": _format_minute(leg.departure),
+                "departure_day_offset": leg.departure // MINUTES_PER_DAY,
+                "arrival_time": _format_minute(leg.arrival),
+                "arrival_day_offset": leg.arrival // MINUTES_PER_DAY,
+            }
+        )
 
-    disconnect(con)
+    return {"journey": journey}
@@ -1,8 +1,22 @@
-from app.db import connect, disconnect
-from app.models.mess import Mess, MessMenu, MessMenuItem, DayMenu
+from app.db import fetchall, get_db
+from psycopg2.extensions import connection
+from app.models.mess import (
+    Mess,
+    MessMenu,
+    MessMenuItem,
+    DAYS,
+    SLOTS,
+    get_current_mess_menu,
+    get_mess_menu_items_strict,
+    get_mess_menu_meals,
+    get_mess_menus,
+    get_messes,
+)
 from app.models.globals import Location
+from app.models.mess_timings import get_meal_index
 from app.auth.key import get_api_key
-from fastapi import Depends, status, HTTPException, APIRouter
+from config import api_config
+from fastapi import Depends, Query, status, HTTPException, APIRouter
 from fastapi.security.api_key import APIKey
 from app.utils.globals import obj_to_json
 from app.models.requests._mess import (
@@ -29,13 +43,18 @@ from app.models.responses._mess import (
     GetCurrentMessMenuDetailsResponseModel_ERR_404,
     GetCurrentMessMenuDetailsByDayResponseModel,
     GetCurrentMessMenuDetailsByDayResponseModel_ERR_404,
+    GetCurrentMessMenuDetailsByMealResponseModel,
+    GetCurrentMessMenuDetailsByMealResponseModel_ERR_404,
+    GetMessNowResponseModel,
     GetMessMenuDetailsResponseModel,
     GetMessMenuDetailsByIDsResponseModel,
     GetMessMenuDetailsByIDsResponseModel_ERR_404,
     CreateMessMenuResponseModel,
     CreateMessMenuResponseModel_ERR_400,
+    CreateMessMenuResponseModel_ERR_404,
     UpdateMessMenuResponseModel,
     UpdateMessMenuResponseModel_ERR_404,
+    UpdateMessMenuResponseModel_ERR_404_MessMenuItemsNotFound,
     DeleteMessMenuResponseModel_ERR_404,
     GetAllMessMenuItemsDetails,
     GetMessMenuItemDetailsResponseModel,
@@ -47,37 +66,96 @@ from app.models.responses._mess import (
     DeleteMessMenuItemResponseModel_ERR_404,
 )
 from typing import Optional, Literal
+from datetime import datetime, time
+from zoneinfo import ZoneInfo
 
 
 router = APIRouter()
 
 
+def _submitted_slots(
+    params: NewMessMenuBodyParams | UpdateMessMenuBodyParams,
+) -> list[tuple[str, str, list[int]]]:
+    return [
+        (day, meal, getattr(params, day)[meal])
+        for day, meal in SLOTS
+        if getattr(params, day) is not None and getattr(params, day)[meal] is not None
+    ]
+
+
 @router.get(
     "/mess",
     summary="Get Details of All Messes on the Campus",
     tags=["mess"],
     response_model=GetAllMessDetailsResponseModel,
 )
-async def get_all_mess_details():
-    con = connect()
-    cursor = con.cursor()
+async def get_all_mess_details(con: connection = Depends(get_db)):
+    messes = await get_messes(con)
 
-    cursor.execute("SELECT id FROM messes")
-    result = cursor.fetchall()
-    ids = [row[0] for row in result]
-
-    cursor.close()
+    details = [obj_to_json(mess) for mess in messes]
 
-    details = []
-    for id in ids:
-        mess = Mess(id=id)
-        await mess.sync_details(con)
+    return {"messes": details}
 
-        details.append(obj_to_json(mess))
 
-    disconnect(con)
+@router.get(
+    "/mess/now",
+    summary="Get the Meal being Served Right Now (or Next) at every Mess",
+    tags=["mess"],
+    response_model=GetMessNowResponseModel,
+)
+async def get_mess_now(
+    at: time | None = None,
+    day: Literal[
+        "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"
+    ]
+    | None = None,
+    con: connection = Depends(get_db),
+):
+    now = datetime.now(ZoneInfo(api_config["timezone"]))
+    if at is None:
+        at = now.time()
+    if day is None:
+        day = DAYS[now.weekday()]
+
+    index = await get_meal_index(con)
+    minute = at.hour * 60 + at.minute
+
+    found = []
+    for schedule in index.schedules:
+        result = schedule.find(minute)
+        if result is None:
+            continue
+
+        interval, day_offset, serving = result
+        meal_day = DAYS[(DAYS.index(day) + day_offset) % len(DAYS)]
+        found.append((schedule, interval, meal_day, serving))
+
+    meals = await get_mess_menu_meals(
+        con,
+        [
+            (schedule.menu_id, meal_day, interval.meal)
+            for schedule, interval, meal_day, _ in found
+            if schedule.menu_id is not None
+        ],
+    )
 
-    return {"messes": details}
+    return {
+        "messes": [
+            {
+                "mess_id": schedule.mess_id,
+                "mess_name": schedule.name,
+                "day": meal_day,
+                "meal": interval.meal,
+                "start": interval.start.strftime("%H:%M"),
+                "end": interval.end.strftime("%H:%M"),
+                "serving": serving,
+                "items": obj_to_json(meals[(schedule.menu_id, meal_day, interval.meal)])
+                if schedule.menu_id is not None
+                else None,
+            }
+            for schedule, interval, meal_day, serving in found
+        ]
+    }
 
 
 @router.get(
@@ -92,14 +170,10 @@ async def get_all_mess_details():
         }
     },
 )
-async def get_mess_details(id: int):
-    con = connect()
-
+async def get_mess_details(id: int, con: connection = Depends(get_db)):
     mess = Mess(id=id)
     await mess.sync_details(con)
 
-    disconnect(con)
-
     return {"mess": obj_to_json(mess)}
 
 
@@ -117,13 +191,14 @@ async def get_mess_details(id: int):
     },
 )
 async def create_mess(
-    params: NewMessBodyParams, api_key: APIKey = Depends(get_api_key)
+    params: NewMessBodyParams,
+    api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
     params_dict = params.model_dump()
     if params_dict["location"] is not None:
         params_dict["location"] = Location(**params_dict["location"])
 
-    con = connect()
     mess = Mess(**params_dict)
 
     try:
@@ -134,7 +209,6 @@ async def create_mess(
         )
     except HTTPException as e:
         if e.status_code != status.HTTP_404_NOT_FOUND:
-            disconnect(con)
             raise e
 
     await mess.create(con)
@@ -155,9 +229,11 @@ async def create_mess(
     },
 )
 async def update_mess(
-    id: int, params: UpdateMessBodyParams, api_key: APIKey = Depends(get_api_key)
+    id: int,
+    params: UpdateMessBodyParams,
+    api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
     mess = Mess(id=id)
     await mess.sync_details(con=con)
     params_dict = params.model_dump()
@@ -170,8 +246,6 @@ async def update_mess(
 
     await mess.update(con)
 
-    disconnect(con)
-
     return {"mess": obj_to_json(mess)}
 
 
@@ -189,10 +263,11 @@ async def update_mess(
     },
 )
 async def update_mess_change_menu(
-    mess_id: int, menu_id: int, api_key: APIKey = Depends(get_api_key)
+    mess_id: int,
+    menu_id: int,
+    api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
-
     mess = Mess(id=mess_id)
     await mess.sync_details(con)
 
@@ -202,8 +277,6 @@ async def update_mess_change_menu(
     mess.menu = menu
     await mess.update(con)
 
-    disconnect(con)
-
     return {"mess": obj_to_json(mess)}
 
 
@@ -219,15 +292,14 @@ async def update_mess_change_menu(
         }
     },
 )
-async def delete_mess(id: int, api_key: APIKey = Depends(get_api_key)):
-    con = connect()
+async def delete_mess(
+    id: int, api_key: APIKey = Depends(get_api_key), con: connection = Depends(get_db)
+):
     mess = Mess(id=id)
     await mess.sync_details(con=con)
 
     await mess.remove(con)
 
-    disconnect(con)
-
 
 @router.get(
     "/mess/{id}/menu",
@@ -241,17 +313,10 @@ async def delete_mess(id: int, api_key: APIKey = Depends(get_api_key)):
         }
     },
 )
-async def get_current_mess_menu_details(id: int):
-    con = connect()
-
-    mess = Mess(id=id)
-    await mess.sync_details(con)
-
-    disconnect(con)
-
-    menu = mess.menu
+async def get_current_mess_menu_details(id: int, con: connection = Depends(get_db)):
+    menu = await get_current_mess_menu(con, id)
 
-    return {"menu": menu}
+    return {"menu": obj_to_json(menu)}
 
 
 @router.get(
@@ -271,57 +336,69 @@ async def get_current_mess_menu_details_byDay(
     day: Literal[
         "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"
     ],
+    con: connection = Depends(get_db),
 ):
-    con = connect()
-
-    mess = Mess(id=id)
-    await mess.sync_details(con)
-
-    disconnect(con)
-
-    menu = mess.menu
+    menu = await get_current_mess_menu(con, id, day=day)
 
     if menu is None:
         return {"menu": None}
 
     menu_today = getattr(menu, day)
 
-    return {"menu": menu_today}
+    return {"menu": obj_to_json(menu_today)}
 
 
 @router.get(
-    "/mess_menu",
-    summary="Get Details of any Mess Menus by Month/Year",
+    "/mess/{id}/menu/{day}/{meal}",
+    summary="Get the Current Menu of a particular Meal of any Mess by ID",
     tags=["mess"],
-    response_model=GetMessMenuDetailsResponseModel,
+    response_model=GetCurrentMessMenuDetailsByMealResponseModel,
+    responses={
+        status.HTTP_404_NOT_FOUND: {
+            "description": "Not Found Error",
+            "model": GetCurrentMessMenuDetailsByMealResponseModel_ERR_404,
+        }
+    },
 )
-async def get_mess_menu_details(month: int | None = None, year: int | None = None):
-    con = connect()
-    cursor = con.cursor()
-
-    cursor.execute("SELECT id FROM messes")
-    result = cursor.fetchall()
-    ids = [row[0] for row in result]
-
-    cursor.close()
+async def get_current_mess_menu_details_byMeal(
+    id: int,
+    day: Literal[
+        "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"
+    ],
+    meal: Literal["breakfast", "lunch", "snacks", "dinner"],
+    con: connection = Depends(get_db),
+):
+    menu = await get_current_mess_menu(con, id, day=day, meal=meal)
 
-    details = []
-    for id in ids:
-        menu = MessMenu(id=id)
-        await menu.sync_details(con)
+    if menu is None:
+        return {"menu": None}
 
-        if year is not None:
-            if menu.year != year:
-                continue
-        if month is not None:
-            if menu.month != month:
-                continue
+    return {"menu": obj_to_json(getattr(menu, day)[meal])}
 
-        details.append(obj_to_json(menu))
 
-    disconnect(con)
+@router.get(
+    "/mess_menu",
+    summary="Get Details of any Mess Menus by Month/Year",
+    tags=["mess"],
+    response_model=GetMessMenuDetailsResponseModel,
+)
+async def get_mess_menu_details(
+    month: int | None = None,
+    year: int | None = None,
+    after_id: int | None = None,
+    limit: int | None = Query(None, ge=1),
+    con: connection = Depends(get_db),
+):
+    menus = await get_mess_menus(
+        con, month=month, year=year, after_id=after_id, limit=limit
+    )
 
-    return {"menus": details}
+    return {
+        "menus": [obj_to_json(menu) for menu in menus],
+        "next_after_id": menus[-1].id
+        if limit is not None and len(menus) == limit
+        else None,
+    }
 
 
 @router.get(
@@ -336,14 +413,10 @@ async def get_mess_menu_details(month: int | None = None, year: int | None = Non
         }
     },
 )
-async def get_mess_menu_details_byID(id: int):
-    con = connect()
-
+async def get_mess_menu_details_byID(id: int, con: connection = Depends(get_db)):
     menu = MessMenu(id=id)
     await menu.sync_details(con)
 
-    disconnect(con)
-
     return {"menu": obj_to_json(menu)}
 
 
@@ -357,14 +430,18 @@ async def get_mess_menu_details_byID(id: int):
         status.HTTP_400_BAD_REQUEST: {
             "description": "Bad Request Error",
             "model": CreateMessMenuResponseModel_ERR_400,
-        }
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "description": "Not Found Error",
+            "model": CreateMessMenuResponseModel_ERR_404,
+        },
     },
 )
 async def create_mess_menu(
-    params: NewMessMenuBodyParams, api_key: APIKey = Depends(get_api_key)
+    params: NewMessMenuBodyParams,
+    api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
-
     try:
         menu = MessMenu(month=params.month, year=params.year)
         await menu.sync_details(con)
@@ -374,326 +451,18 @@ async def create_mess_menu(
         )
     except HTTPException as e:
         if e.status_code != status.HTTP_404_NOT_FOUND:
-            disconnect(con)
             raise e
 
-    monday: DayMenu | None = None
-    if params.monday is not None:
-        monday = {}
-        if params.monday["breakfast"] is not None:
-            monday["breakfast"] = [
-                MessMenuItem(id=item_id) for item_id in params.monday["breakfast"]
-            ]
-
-            for item in monday["breakfast"]:
-                await item.sync_details(con)
-        else:
-            monday["breakfast"] = None
-
-        if params.monday["lunch"] is not None:
-            monday["lunch"] = [
-                MessMenuItem(id=item_id) for item_id in params.monday["lunch"]
-            ]
-
-            for item in monday["lunch"]:
-                await item.sync_details(con)
-        else:
-            monday["lunch"] = None
-
-        if params.monday["snacks"] is not None:
-            monday["snacks"] = [
-                MessMenuItem(id=item_id) for item_id in params.monday["snacks"]
-            ]
-
-            for item in monday["snacks"]:
-                await item.sync_details(con)
-        else:
-            monday["snacks"] = None
-
-        if params.monday["dinner"] is not None:
-            monday["dinner"] = [
-                MessMenuItem(id=item_id) for item_id in params.monday["dinner"]
-            ]
-
-            for item in monday["dinner"]:
-                await item.sync_details(con)
-        else:
-            monday["dinner"] = None
-
-    tuesday: DayMenu | None = None
-    if params.tuesday is not None:
-        tuesday = {}
-        if params.tuesday["breakfast"] is not None:
-            tuesday["breakfast"] = [
-                MessMenuItem(id=item_id) for item_id in params.tuesday["breakfast"]
-            ]
-
-            for item in tuesday["breakfast"]:
-                await item.sync_details(con)
-        else:
-            tuesday["breakfast"] = None
-
-        if params.tuesday["lunch"] is not None:
-            tuesday["lunch"] = [
-                MessMenuItem(id=item_id) for item_id in params.tuesday["lunch"]
-            ]
-
-            for item in tuesday["lunch"]:
-                await item.sync_details(con)
-        else:
-            tuesday["lunch"] = None
-
-        if params.tuesday["snacks"] is not None:
-            tuesday["snacks"] = [
-                MessMenuItem(id=item_id) for item_id in params.tuesday["snacks"]
-            ]
-
-            for item in tuesday["snacks"]:
-                await item.sync_details(con)
-        else:
-            tuesday["snacks"] = None
-
-        if params.tuesday["dinner"] is not None:
-            tuesday["dinner"] = [
-                MessMenuItem(id=item_id) for item_id in params.tuesday["dinner"]
-            ]
-
-            for item in tuesday["dinner"]:
-                await item.sync_details(con)
-        else:
-            tuesday["dinner"] = None
-
-    wednesday: DayMenu | None = None
-    if params.wednesday is not None:
-        wednesday = {}
-        if params.wednesday["breakfast"] is not None:
-            wednesday["breakfast"] = [
-                MessMenuItem(id=item_id) for item_id in params.wednesday["breakfast"]
-            ]
-
-            for item in wednesday["breakfast"]:
-                await item.sync_details(con)
-        else:
-            wednesday["breakfast"] = None
-
-        if params.wednesday["lunch"] is not None:
-            wednesday["lunch"] = [
-                MessMenuItem(id=item_id) for item_id in params.wednesday["lunch"]
-            ]
-
-            for item in wednesday["lunch"]:
-                await item.sync_details(con)
-        else:
-            wednesday["lunch"] = None
-
-        if params.wednesday["snacks"] is not None:
-            wednesday["snacks"] = [
-                MessMenuItem(id=item_id) for item_id in params.wednesday["snacks"]
-            ]
-
-            for item in wednesday["snacks"]:
-                await item.sync_details(con)
-        else:
-            wednesday["snacks"] = None
-
-        if params.wednesday["dinner"] is not None:
-            wednesday["dinner"] = [
-                MessMenuItem(id=item_id) for item_id in params.wednesday["dinner"]
-            ]
-
-            for item in wednesday["dinner"]:
-                await item.sync_details(con)
-        else:
-            wednesday["dinner"] = None
-
-    thursday: DayMenu | None = None
-    if params.thursday is not None:
-        thursday = {}
-        if params.thursday["breakfast"] is not None:
-            thursday["breakfast"] = [
-                MessMenuItem(id=item_id) for item_id in params.thursday["breakfast"]
-            ]
-
-            for item in thursday["breakfast"]:
-                await item.sync_details(con)
-        else:
-            thursday["breakfast"] = None
-
-        if params.thursday["lunch"] is not None:
-            thursday["lunch"] = [
-                MessMenuItem(id=item_id) for item_id in params.thursday["lunch"]
-            ]
-
-            for item in thursday["lunch"]:
-                await item.sync_details(con)
-        else:
-            thursday["lunch"] = None
-
-        if params.thursday["snacks"] is not None:
-            thursday["snacks"] = [
-                MessMenuItem(id=item_id) for item_id in params.thursday["snacks"]
-            ]
-
-            for item in thursday["snacks"]:
-                await item.sync_details(con)
-        else:
-            thursday["snacks"] = None
-
-        if params.thursday["dinner"] is not None:
-            thursday["dinner"] = [
-                MessMenuItem(id=item_id) for item_id in params.thursday["dinner"]
-            ]
-
-            for item in thursday["dinner"]:
-                await item.sync_details(con)
-        else:
-            thursday["dinner"] = None
-
-    friday: DayMenu | None = None
-    if params.friday is not None:
-        friday = {}
-        if params.friday["breakfast"] is not None:
-            friday["breakfast"] = [
-                MessMenuItem(id=item_id) for item_id in params.friday["breakfast"]
-            ]
-
-            for item in friday["breakfast"]:
-                await item.sync_details(con)
-        else:
-            friday["breakfast"] = None
-
-        if params.friday["lunch"] is not None:
-            friday["lunch"] = [
-                MessMenuItem(id=item_id) for item_id in params.friday["lunch"]
-            ]
-
-            for item in friday["lunch"]:
-                await item.sync_details(con)
-        else:
-            friday["lunch"] = None
-
-        if params.friday["snacks"] is not None:
-            friday["snacks"] = [
-                MessMenuItem(id=item_id) for item_id in params.friday["snacks"]
-            ]
-
-            for item in friday["snacks"]:
-                await item.sync_details(con)
-        else:
-            friday["snacks"] = None
-
-        if params.friday["dinner"] is not None:
-            friday["dinner"] = [
-                MessMenuItem(id=item_id) for item_id in params.friday["dinner"]
-            ]
-
-            for item in friday["dinner"]:
-                await item.sync_details(con)
-        else:
-            friday["dinner"] = None
-
-    saturday: DayMenu | None = None
-    if params.saturday is not None:
-        saturday = {}
-        if params.saturday["breakfast"] is not None:
-            saturday["breakfast"] = [
-                MessMenuItem(id=item_id) for item_id in params.saturday["breakfast"]
-            ]
-
-            for item in saturday["breakfast"]:
-                await item.sync_details(con)
-        else:
-            saturday["breakfast"] = None
-
-        if params.saturday["lunch"] is not None:
-            saturday["lunch"] = [
-                MessMenuItem(id=item_id) for item_id in params.saturday["lunch"]
-            ]
-
-            for item in saturday["lunch"]:
-                await item.sync_details(con)
-        else:
-            saturday["lunch"] = None
-
-        if params.saturday["snacks"] is not None:
-            saturday["snacks"] = [
-                MessMenuItem(id=item_id) for item_id in params.saturday["snacks"]
-            ]
-
-            for item in saturday["snacks"]:
-                await item.sync_details(con)
-        else:
-            saturday["snacks"] = None
-
-        if params.saturday["dinner"] is not None:
-            saturday["dinner"] = [
-                MessMenuItem(id=item_id) for item_id in params.saturday["dinner"]
-            ]
-
-            for item in saturday["dinner"]:
-                await item.sync_details(con)
-
-        else:
-            saturday["dinner"] = None
-
-    sunday: DayMenu | None = None
-    if params.sunday is not None:
-        sunday = {}
-        if params.sunday["breakfast"] is not None:
-            sunday["breakfast"] = [
-                MessMenuItem(id=item_id) for item_id in params.sunday["breakfast"]
-            ]
-
-            for item in sunday["breakfast"]:
-                await item.sync_details(con)
-        else:
-            sunday["breakfast"] = None
-
-        if params.sunday["lunch"] is not None:
-            sunday["lunch"] = [
-                MessMenuItem(id=item_id) for item_id in params.sunday["lunch"]
-            ]
-
-            for item in sunday["lunch"]:
-                await item.sync_details(con)
-        else:
-            sunday["lunch"] = None
-
-        if params.sunday["snacks"] is not None:
-            sunday["snacks"] = [
-                MessMenuItem(id=item_id) for item_id in params.sunday["snacks"]
-            ]
-
-            for item in sunday["snacks"]:
-                await item.sync_details(con)
-        else:
-            sunday["snacks"] = None
-
-        if params.sunday["dinner"] is not None:
-            sunday["dinner"] = [
-                MessMenuItem(id=item_id) for item_id in params.sunday["dinner"]
-            ]
-
-            for item in sunday["dinner"]:
-                await item.sync_details(con)
-        else:
-            sunday["dinner"] = None
-
-    menu = MessMenu(
-        month=params.month,
-        year=params.year,
-        monday=monday,
-        tuesday=tuesday,
-        wednesday=wednesday,
-        thursday=thursday,
-        friday=friday,
-        saturday=saturday,
-        sunday=sunday,
+    slots = _submitted_slots(params)
+    items = await get_mess_menu_items_strict(
+        con, [item_id for _, _, item_ids in slots for item_id in item_ids]
     )
 
-    await menu.create(con)
+    menu = MessMenu(month=params.month, year=params.year)
+    for day, meal, item_ids in slots:
+        menu.set_slot(day, meal, [items[item_id] for item_id in item_ids])
 
-    disconnect(con)
+    await menu.create(con)
 
     return {"menu": obj_to_json(menu)}
 
@@ -706,7 +475,8 @@ async def create_mess_menu(
     responses={
         status.HTTP_404_NOT_FOUND: {
             "description": "Not Found Error",
-            "model": UpdateMessMenuResponseModel_ERR_404,
+            "model": UpdateMessMenuResponseModel_ERR_404
+            | UpdateMessMenuResponseModel_ERR_404_MessMenuItemsNotFound,
         }
     },
 )
@@ -714,301 +484,20 @@ async def update_mess_menu(
     id: int,
     params: UpdateMessMenuBodyParams,
     api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
     menu = MessMenu(id=id)
     await menu.sync_details(con)
 
-    if params.monday is not None:
-        if params.monday["breakfast"] is not None:
-            monday_breakfast = [
-                MessMenuItem(id=item_id) for item_id in params.monday["breakfast"]
-            ]
-
-            for item in monday_breakfast:
-                await item.sync_details(con)
-
-            menu.monday["breakfast"] = monday_breakfast
-
-        if params.monday["lunch"] is not None:
-            monday_lunch = [
-                MessMenuItem(id=item_id) for item_id in params.monday["lunch"]
-            ]
-
-            for item in monday_lunch:
-                await item.sync_details(con)
-
-            menu.monday["lunch"] = monday_lunch
-
-        if params.monday["snacks"] is not None:
-            monday_snacks = [
-                MessMenuItem(id=item_id) for item_id in params.monday["snacks"]
-            ]
-
-            for item in monday_snacks:
-                await item.sync_details(con)
-
-            menu.monday["snacks"] = monday_snacks
-
-        if params.monday["dinner"] is not None:
-            monday_dinner = [
-                MessMenuItem(id=item_id) for item_id in params.monday["dinner"]
-            ]
-
-            for item in monday_dinner:
-                await item.sync_details(con)
-
-            menu.monday["dinner"] = monday_dinner
-
-    if params.tuesday is not None:
-        if params.tuesday["breakfast"] is not None:
-            tuesday_breakfast = [
-                MessMenuItem(id=item_id) for item_id in params.tuesday["breakfast"]
-            ]
-
-            for item in tuesday_breakfast:
-                await item.sync_details(con)
-
-            menu.tuesday["breakfast"] = tuesday_breakfast
-
-        if params.tuesday["lunch"] is not None:
-            tuesday_lunch = [
-                MessMenuItem(id=item_id) for item_id in params.tuesday["lunch"]
-            ]
-
-            for item in tuesday_lunch:
-                await item.sync_details(con)
-
-            menu.tuesday["lunch"] = tuesday_lunch
-
-        if params.tuesday["snacks"] is not None:
-            tuesday_snacks = [
-                MessMenuItem(id=item_id) for item_id in params.tuesday["snacks"]
-            ]
-
-            for item in tuesday_snacks:
-                await item.sync_details(con)
-
-            menu.tuesday["snacks"] = tuesday_snacks
-
-        if params.tuesday["dinner"] is not None:
-            tuesday_dinner = [
-                MessMenuItem(id=item_id) for item_id in params.tuesday["dinner"]
-            ]
-
-            for item in tuesday_dinner:
-                await item.sync_details(con)
-
-            menu.tuesday["dinner"] = tuesday_dinner
-
-    if params.wednesday is not None:
-        if params.wednesday["breakfast"] is not None:
-            wednesday_breakfast = [
-                MessMenuItem(id=item_id) for item_id in params.wednesday["breakfast"]
-            ]
-
-            for item in wednesday_breakfast:
-                await item.sync_details(con)
-
-            menu.wednesday["breakfast"] = wednesday_breakfast
-
-        if params.wednesday["lunch"] is not None:
-            wednesday_lunch = [
-                MessMenuItem(id=item_id) for item_id in params.wednesday["lunch"]
-            ]
-
-            for item in wednesday_lunch:
-                await item.sync_details(con)
-
-            menu.wednesday["lunch"] = wednesday_lunch
-
-        if params.wednesday["snacks"] is not None:
-            wednesday_snacks = [
-                MessMenuItem(id=item_id) for item_id in params.wednesday["snacks"]
-            ]
-
-            for item in wednesday_snacks:
-                await item.sync_details(con)
-
-            menu.wednesday["snacks"] = wednesday_snacks
-
-        if params.wednesday["dinner"] is not None:
-            wednesday_dinner = [
-                MessMenuItem(id=item_id) for item_id in params.wednesday["dinner"]
-            ]
-
-            for item in wednesday_dinner:
-                await item.sync_details(con)
-
-            menu.wednesday["dinner"] = wednesday_dinner
-
-    if params.thursday is not None:
-        if params.thursday["breakfast"] is not None:
-            thursday_breakfast = [
-                MessMenuItem(id=item_id) for item_id in params.thursday["breakfast"]
-            ]
-
-            for item in thursday_breakfast:
-                await item.sync_details(con)
-
-            menu.thursday["breakfast"] = thursday_breakfast
-
-        if params.thursday["lunch"] is not None:
-            thursday_lunch = [
-                MessMenuItem(id=item_id) for item_id in params.thursday["lunch"]
-            ]
-
-            for item in thursday_lunch:
-                await item.sync_details(con)
-
-            menu.thursday["lunch"] = thursday_lunch
-
-        if params.thursday["snacks"] is not None:
-            thursday_snacks = [
-                MessMenuItem(id=item_id) for item_id in params.thursday["snacks"]
-            ]
-
-            for item in thursday_snacks:
-                await item.sync_details(con)
-
-            menu.thursday["snacks"] = thursday_snacks
-
-        if params.thursday["dinner"] is not None:
-            thursday_dinner = [
-                MessMenuItem(id=item_id) for item_id in params.thursday["dinner"]
-            ]
-
-            for item in thursday_dinner:
-                await item.sync_details(con)
-
-            menu.thursday["dinner"] = thursday_dinner
-
-    if params.friday is not None:
-        if params.friday["breakfast"] is not None:
-            friday_breakfast = [
-                MessMenuItem(id=item_id) for item_id in params.friday["breakfast"]
-            ]
-
-            for item in friday_breakfast:
-                await item.sync_details(con)
-
-            menu.friday["breakfast"] = friday_breakfast
-
-        if params.friday["lunch"] is not None:
-            friday_lunch = [
-                MessMenuItem(id=item_id) for item_id in params.friday["lunch"]
-            ]
-
-            for item in friday_lunch:
-                await item.sync_details(con)
-
-            menu.friday["lunch"] = friday_lunch
-
-        if params.friday["snacks"] is not None:
-            friday_snacks = [
-                MessMenuItem(id=item_id) for item_id in params.friday["snacks"]
-            ]
-
-            for item in friday_snacks:
-                await item.sync_details(con)
-
-            menu.friday["snacks"] = friday_snacks
-
-        if params.friday["dinner"] is not None:
-            friday_dinner = [
-                MessMenuItem(id=item_id) for item_id in params.friday["dinner"]
-            ]
-
-            for item in friday_dinner:
-                await item.sync_details(con)
-
-            menu.friday["dinner"] = friday_dinner
-
-    if params.saturday is not None:
-        if params.saturday["breakfast"] is not None:
-            saturday_breakfast = [
-                MessMenuItem(id=item_id) for item_id in params.saturday["breakfast"]
-            ]
-
-            for item in saturday_breakfast:
-                await item.sync_details(con)
-
-            menu.saturday["breakfast"] = saturday_breakfast
-
-        if params.saturday["lunch"] is not None:
-            saturday_lunch = [
-                MessMenuItem(id=item_id) for item_id in params.saturday["lunch"]
-            ]
-
-            for item in saturday_lunch:
-                await item.sync_details(con)
-
-            menu.saturday["lunch"] = saturday_lunch
-
-        if params.saturday["snacks"] is not None:
-            saturday_snacks = [
-                MessMenuItem(id=item_id) for item_id in params.saturday["snacks"]
-            ]
-
-            for item in saturday_snacks:
-                await item.sync_details(con)
-
-            menu.saturday["snacks"] = saturday_snacks
-
-        if params.saturday["dinner"] is not None:
-            saturday_dinner = [
-                MessMenuItem(id=item_id) for item_id in params.saturday["dinner"]
-            ]
-
-            for item in saturday_dinner:
-                await item.sync_details(con)
-
-            menu.saturday["dinner"] = saturday_dinner
-
-    if params.sunday is not None:
-        if params.sunday["breakfast"] is not None:
-            sunday_breakfast = [
-                MessMenuItem(id=item_id) for item_id in params.sunday["breakfast"]
-            ]
-
-            for item in sunday_breakfast:
-                await item.sync_details(con)
-
-            menu.sunday["breakfast"] = sunday_breakfast
-
-        if params.sunday["lunch"] is not None:
-            sunday_lunch = [
-                MessMenuItem(id=item_id) for item_id in params.sunday["lunch"]
-            ]
-
-            for item in sunday_lunch:
-                await item.sync_details(con)
-
-            menu.sunday["lunch"] = sunday_lunch
-
-        if params.sunday["snacks"] is not None:
-            sunday_snacks = [
-                MessMenuItem(id=item_id) for item_id in params.sunday["snacks"]
-            ]
-
-            for item in sunday_snacks:
-                await item.sync_details(con)
-
-            menu.sunday["snacks"] = sunday_snacks
-
-        if params.sunday["dinner"] is not None:
-            sunday_dinner = [
-                MessMenuItem(id=item_id) for item_id in params.sunday["dinner"]
-            ]
-
-            for item in sunday_dinner:
-                await item.sync_details(con)
-
-            menu.sunday["dinner"] = sunday_dinner
+    slots = _submitted_slots(params)
+    items = await get_mess_menu_items_strict(
+        con, [item_id for _, _, item_ids in slots for item_id in item_ids]
+    )
 
-    await menu.update(con)
+    for day, meal, item_ids in slots:
+        menu.set_slot(day, meal, [items[item_id] for item_id in item_ids])
 
-    disconnect(con)
+    await menu.update(con, slots=[(day, meal) for day, meal, _ in slots])
 
     return {"menu": obj_to_json(menu)}
 
@@ -1025,15 +514,14 @@ async def update_mess_menu(
         }
     },
 )
-async def delete_mess_menu(id: int, api_key: APIKey = Depends(get_api_key)):
-    con = connect()
+async def delete_mess_menu(
+    id: int, api_key: APIKey = Depends(get_api_key), con: connection = Depends(get_db)
+):
     menu = MessMenu(id=id)
     await menu.sync_details(con)
 
     await menu.remove(con)
 
-    disconnect(con)
-
 
 @router.get(
     "/mess_menu_item",
@@ -1041,16 +529,10 @@ async def delete_mess_menu(id: int, api_key: APIKey = Depends(get_api_key)):
     tags=["mess"],
     response_model=GetAllMessMenuItemsDetails,
 )
-async def get_all_mess_menu_items_details():
-    con = connect()
-    cursor = con.cursor()
-
-    cursor.execute("SELECT id FROM mess_menu_items")
-    result = cursor.fetchall()
+async def get_all_mess_menu_items_details(con: connection = Depends(get_db)):
+    result = await fetchall(con, "SELECT id FROM mess_menu_items")
     ids = [row[0] for row in result]
 
-    cursor.close()
-
     details = []
     for id in ids:
         item = MessMenuItem(id=id)
@@ -1058,8 +540,6 @@ async def get_all_mess_menu_items_details():
 
         details.append(obj_to_json(item))
 
-    disconnect(con)
-
     return {"items": details}
 
 
@@ -1075,14 +555,10 @@ async def get_all_mess_menu_items_details():
         }
     },
 )
-async def get_mess_menu_item_details(id: int):
-    con = connect()
-
+async def get_mess_menu_item_details(id: int, con: connection = Depends(get_db)):
     item = MessMenuItem(id=id)
     await item.sync_details(con)
 
-    disconnect(con)
-
     return {"item": obj_to_json(item)}
 
 
@@ -1100,10 +576,10 @@ async def get_mess_menu_item_details(id: int):
     },
 )
 async def create_mess_menu_item(
-    params: NewMessMenuItemBodyParams, api_key: APIKey = Depends(get_api_key)
+    params: NewMessMenuItemBodyParams,
+    api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
-
     item = MessMenuItem(**params.model_dump())
     try:
         await item.sync_details(con)
@@ -1113,13 +589,10 @@ async def create_mess_menu_item(
         )
     except HTTPException as e:
         if e.status_code != status.HTTP_404_NOT_FOUND:
-            disconnect(con)
             raise e
 
     await item.create(con)
 
-    disconnect(con)
-
     return {"item": obj_to_json(item)}
 
 
@@ -1139,8 +612,8 @@ async def update_mess_menu_item(
     id: int,
     params: UpdateMessMenuItemBodyParams,
     api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
     item = MessMenuItem(id=id)
     await item.sync_details(con)
 
@@ -1151,8 +624,6 @@ async def update_mess_menu_item(
 
     await item.update(con)
 
-    disconnect(con)
-
     return {"item": obj_to_json(item)}
 
 
@@ -1168,11 +639,10 @@ async def update_mess_menu_item(
         }
     },
 )
-async def delete_mess_menu_item(id: int, api_key: APIKey = Depends(get_api_key)):
-    con = connect()
+async def delete_mess_menu_item(
+    id: int, api_key: APIKey = Depends(get_api_key), con: connection = Depends(get_db)
+):
     item = MessMenuItem(id=id)
     await item.sync_details(con)
 
     await item.remove(con)
-
-    disconnect(con)
@@ -1,10 +1,23 @@
-from app.db import connect, disconnect
-from app.models.outlet import FoodOutlet, searchOutlets, FoodOutletMenuItem
+from app.db import get_db
+from psycopg2.extensions import connection
+from app.models.outlet import (
+    FoodOutlet,
+    FoodOutletMenuItem,
+    get_food_outlets,
+    searchMenuItems,
+    searchOutlets,
+)
 from app.models.globals import Location
+from app.models.outlet_index import get_outlet_catalogue, search_cache
 from app.auth.key import get_api_key
-from fastapi import Depends, status, HTTPException, APIRouter
+from fastapi import Depends, Query, Response, status, HTTPException, APIRouter
 from fastapi.security.api_key import APIKey
 from app.utils.globals import obj_to_json
+from app.utils.predicates import get_predicate_stats
+from config import api_config
+from datetime import datetime, time
+from typing import Literal
+from zoneinfo import ZoneInfo
 from app.models.requests._outlet import (
     NewFoodOutletBodyParams,
     UpdateFoodOutletBodyParams,
@@ -14,10 +27,14 @@ from app.models.requests._outlet import (
 )
 from app.models.responses._outlet import (
     GetAllFoodOutletDetailsResponseModel,
+    GetNearestFoodOutletsResponseModel,
+    GetOpenFoodOutletsResponseModel,
     GetFoodOutletDetailsResponseModel,
     GetFoodOutletDetailsResponseModel_ERR_404,
     FilterFoodOutletsResponseModel,
+    FilterFoodOutletsResponseModel_ERR_400,
     FilterFoodOutletsResponseModel_ERR_404,
+    GetSearchPredicateStatsResponseModel,
     CreateFoodOutletResponseModel,
     CreateFoodOutletResponseModel_ERR_400,
     UpdateFoodOutletResponseModel,
@@ -39,32 +56,78 @@ from app.models.responses._outlet import (
 router = APIRouter()
 
 
+def _normalize_search_text(value: str | None) -> str | None:
+    if value is None:
+        return None
+
+    value = " ".join(value.split()).lower()
+    return value if value != "" else None
+
+
 @router.get(
     "/food-outlet",
     summary="Get Details of All Food Outlets on the Campus",
     tags=["food outlets"],
     response_model=GetAllFoodOutletDetailsResponseModel,
 )
-async def get_all_food_outlet_details():
-    con = connect()
-    cursor = con.cursor()
-
-    cursor.execute("SELECT id FROM food_outlets")
-    result = cursor.fetchall()
-    ids = [row[0] for row in result]
-    details = []
-
-    # print(ids)
-    cursor.close()
-    for id in ids:
-        outlet = FoodOutlet(id=id)
-        await outlet.sync_details(con)
+async def get_all_food_outlet_details(con: connection = Depends(get_db)):
+    outlets = await get_food_outlets(con)
+
+    return {"outlets": [obj_to_json(outlet) for outlet in outlets]}
+
+
+@router.get(
+    "/food-outlet/nearest",
+    summary="Get the Food Outlets Nearest to a Location",
+    tags=["food outlets"],
+    response_model=GetNearestFoodOutletsResponseModel,
+)
+async def get_nearest_food_outlets(
+    lat: float = Query(ge=-90, le=90),
+    lon: float = Query(ge=-180, le=180),
+    k: int = Query(5, ge=1, le=50),
+    con: connection = Depends(get_db),
+):
+    catalogue = await get_outlet_catalogue(con)
+    distances = dict(catalogue.ranking.nearest(lat, lon, k))
 
-        details.append(obj_to_json(outlet))
+    outlets = await get_food_outlets(con, list(distances))
+
+    return {
+        "outlets": [
+            {**obj_to_json(outlet), "distance_km": distances[outlet.id]}
+            for outlet in outlets
+        ]
+    }
 
-    disconnect(con)
 
-    return {"outlets": details}
+@router.get(
+    "/food-outlet/open",
+    summary="Get the Food Outlets Open at a given Time (default: now)",
+    tags=["food outlets"],
+    response_model=GetOpenFoodOutletsResponseModel,
+)
+async def get_open_food_outlets(
+    at: time | None = None, con: connection = Depends(get_db)
+):
+    if at is None:
+        at = datetime.now(ZoneInfo(api_config["timezone"])).time()
+
+    catalogue = await get_outlet_catalogue(con)
+    open_ids = catalogue.open.open_at(at)
+
+    return {
+        "outlets": [
+            {
+                "id": id,
+                "name": catalogue.names[id],
+                "open_time": str(catalogue.hours[id][0]),
+                "close_time": str(catalogue.hours[id][1]),
+            }
+            for id in catalogue.ids
+            if id in open_ids
+        ]
+    }
 
 
 @router.get(
@@ -79,12 +142,9 @@ async def get_all_food_outlet_details():
         },
     },
 )
-async def get_food_outlet_details(id: int):
-    con = connect()
-
+async def get_food_outlet_details(id: int, con: connection = Depends(get_db)):
     outlet = FoodOutlet(id=id)
     await outlet.sync_details(con)
-    disconnect(con)
 
     return {"outlet": obj_to_json(outlet)}
 
@@ -95,6 +155,10 @@ async def get_food_outlet_details(id: int):
     tags=["food outlets"],
     response_model=FilterFoodOutletsResponseModel,
     responses={
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Bad Request Error",
+            "model": FilterFoodOutletsResponseModel_ERR_400,
+        },
         status.HTTP_404_NOT_FOUND: {
             "description": "Not Found Error",
             "model": FilterFoodOutletsResponseModel_ERR_404,
@@ -102,39 +166,135 @@ async def get_food_outlet_details(id: int):
     },
 )
 async def filter_food_outlets(
-    params: FilterFoodOutletBodyParams,
+    response: Response,
+    params: FilterFoodOutletBodyParams | None = None,
+    name: str | None = None,
+    lat: float | None = Query(None, ge=-90, le=90),
+    lon: float | None = Query(None, ge=-180, le=180),
+    landmark: str | None = None,
+    at: time | None = None,
+    open_now: bool = False,
+    rating: float | None = None,
+    food_item: str | None = None,
+    radius_km: float = Query(1, gt=0),
+    min_price: int | None = Query(None, ge=0),
+    max_price: int | None = Query(None, ge=0),
+    max_cal: int | None = Query(None, ge=0),
+    sort: Literal["price"] | None = None,
+    con: connection = Depends(get_db),
 ):
-    con = connect()
-    outlets = [
-        obj_to_json(outlet)
-        for outlet in await searchOutlets(
-            con=con,
-            nameFilter=params.name.lower() if params.name is not None else None,
-            locationFilter=Location(**params.location)
-            if params.location is not None
-            else None,
-            landmarkFilter=params.landmark.lower()
-            if params.landmark is not None
-            else None,
-            timeFilter=params.current_time,
-            ratingFilter=params.rating,
-            itemFilter=params.food_item.lower()
-            if params.food_item is not None
-            else None,
+    # The JSON body form is kept for existing clients and is never cached.
+    if params is not None:
+        outlets = [
+            obj_to_json(outlet)
+            for outlet in await searchOutlets(
+                con=con,
+                nameFilter=params.name.lower() if params.name is not None else None,
+                locationFilter=Location(**params.location.model_dump())
+                if params.location is not None
+                else None,
+                landmarkFilter=params.landmark.lower()
+                if params.landmark is not None
+                else None,
+                timeFilter=params.current_time,
+                ratingFilter=params.rating,
+                itemFilter=params.food_item.lower()
+                if params.food_item is not None
+                else None,
+                radiusFilter=params.radius_km,
+                minPriceFilter=params.min_price,
+                maxPriceFilter=params.max_price,
+                maxCalFilter=params.max_cal,
+                sortBy=params.sort,
+            )
+        ]
+
+        if len(outlets) == 0:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No food outlets found",
+            )
+
+        return {"outlets": outlets}
+
+    if (lat is None) != (lon is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid location"
         )
-    ]
-
-    disconnect(con)
 
+    max_age = int(search_cache.ttl)
+    if at is None and open_now:
+        # Resolved to the minute so that everyone asking "open now" within the
+        # same minute shares a cache entry.
+        now = datetime.now(ZoneInfo(api_config["timezone"]))
+        at = now.time().replace(second=0, microsecond=0, tzinfo=None)
+        max_age = min(max_age, 60 - now.second)
+
+    name = _normalize_search_text(name)
+    landmark = _normalize_search_text(landmark)
+    food_item = _normalize_search_text(food_item)
+    location = (lat, lon) if lat is not None else None
+    radius_km = radius_km if location is not None else None
+
+    key = (
+        name,
+        landmark,
+        food_item,
+        location,
+        radius_km,
+        at,
+        rating,
+        min_price,
+        max_price,
+        max_cal,
+        sort,
+    )
+    outlets = search_cache.get(key)
+    if outlets is None:
+        generation = search_cache.generation
+        outlets = [
+            obj_to_json(outlet)
+            for outlet in await searchOutlets(
+                con=con,
+                nameFilter=name,
+                locationFilter=Location(str(lat), str(lon))
+                if location is not None
+                else None,
+                landmarkFilter=landmark,
+                timeFilter=at,
+                ratingFilter=rating,
+                itemFilter=food_item,
+                radiusFilter=radius_km if radius_km is not None else 1,
+                minPriceFilter=min_price,
+                maxPriceFilter=max_price,
+                maxCalFilter=max_cal,
+                sortBy=sort,
+            )
+        ]
+        search_cache.put(key, outlets, generation)
+
+    cache_control = f"public, max-age={max_age}"
     if len(outlets) == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No food outlets found",
+            headers={"Cache-Control": cache_control},
         )
 
+    response.headers["Cache-Control"] = cache_control
     return {"outlets": outlets}
 
 
+@router.get(
+    "/search/food-outlet/stats",
+    summary="Get Evaluation Counters of the Food Outlet Search Filters",
+    tags=["[admin] food outlets"],
+    response_model=GetSearchPredicateStatsResponseModel,
+)
+async def get_search_predicate_stats(api_key: APIKey = Depends(get_api_key)):
+    return {"predicates": obj_to_json(get_predicate_stats())}
+
+
 @router.post(
     "/food-outlet",
     status_code=status.HTTP_201_CREATED,
@@ -149,7 +309,9 @@ async def filter_food_outlets(
     },
 )
 async def create_food_outlet(
-    params: NewFoodOutletBodyParams, api_key: APIKey = Depends(get_api_key)
+    params: NewFoodOutletBodyParams,
+    api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
     params_dict = params.model_dump()
     if params_dict["location"] is not None:
@@ -159,8 +321,6 @@ async def create_food_outlet(
         if type(value) is str:
             params_dict[key] = value.lower()
 
-    con = connect()
-
     outlet = FoodOutlet(**params_dict)
     try:
         await outlet.sync_details(con)
@@ -172,15 +332,10 @@ async def create_food_outlet(
         if (e.status_code != status.HTTP_404_NOT_FOUND) and (
             e.detail != "Food Outlet not found"
         ):
-            disconnect(con)
             raise e
-        else:
-            con = connect()
 
     await outlet.create(con)
 
-    disconnect(con)
-
     return {"outlet": obj_to_json(outlet)}
 
 
@@ -200,8 +355,8 @@ async def update_food_outlet(
     id: int,
     params: UpdateFoodOutletBodyParams,
     api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
     outlet = FoodOutlet(id=id)
     await outlet.sync_details(con=con)
     params_dict = params.model_dump()
@@ -215,7 +370,6 @@ async def update_food_outlet(
 
     await outlet.update(con=con)
 
-    disconnect(con)
     return {"outlet": obj_to_json(outlet)}
 
 
@@ -235,8 +389,9 @@ async def update_food_outlet(
         },
     },
 )
-async def delete_food_outlet(id: int, api_key: APIKey = Depends(get_api_key)):
-    con = connect()
+async def delete_food_outlet(
+    id: int, api_key: APIKey = Depends(get_api_key), con: connection = Depends(get_db)
+):
     outlet = FoodOutlet(id=id)
 
     try:
@@ -254,25 +409,22 @@ async def delete_food_outlet(id: int, api_key: APIKey = Depends(get_api_key)):
     tags=["food outlets"],
     response_model=GetAllMenuItemsResponseModel,
 )
-async def get_all_menu_items():
-    con = connect()
-    cursor = con.cursor()
-
-    cursor.execute("SELECT id FROM food_outlet_menu_items")
-    result = cursor.fetchall()
-    ids = [row[0] for row in result]
-    details = []
-
-    cursor.close()
-    for id in ids:
-        item = FoodOutletMenuItem(id=id)
-        await item.sync_details(con)
-
-        details.append(obj_to_json(item))
-
-    disconnect(con)
+async def get_all_menu_items(
+    min_price: int | None = Query(None, ge=0),
+    max_price: int | None = Query(None, ge=0),
+    max_cal: int | None = Query(None, ge=0),
+    sort: Literal["price"] | None = None,
+    con: connection = Depends(get_db),
+):
+    items = await searchMenuItems(
+        con,
+        minPriceFilter=min_price,
+        maxPriceFilter=max_price,
+        maxCalFilter=max_cal,
+        sortBy=sort,
+    )
 
-    return {"food_items": details}
+    return {"food_items": [obj_to_json(item) for item in items]}
 
 
 @router.get(
@@ -287,12 +439,9 @@ async def get_all_menu_items():
         },
     },
 )
-async def get_menu_item(id: int):
-    con = connect()
-
+async def get_menu_item(id: int, con: connection = Depends(get_db)):
     item = FoodOutletMenuItem(id=id)
     await item.sync_details(con)
-    disconnect(con)
 
     return {"food_item": obj_to_json(item)}
 
@@ -318,9 +467,8 @@ async def add_menu_item_food_outlet(
     id: int,
     params: AddMenuItemFoodOutletBodyParams,
     api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
-
     outlet = FoodOutlet(id=id)
     await outlet.sync_details(con=con)
 
@@ -340,8 +488,6 @@ async def add_menu_item_food_outlet(
     menu_item = FoodOutletMenuItem(**params_dict, outlet_id=id)
     await menu_item.create(con=con)
 
-    disconnect(con)
-
     return {"item": obj_to_json(menu_item)}
 
 
@@ -363,9 +509,8 @@ async def update_menu_item_food_outlet(
     item_id: int,
     params: UpdateMenuItemFoodOutletBodyParams,
     api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
-
     outlet = FoodOutlet(id=id)
     await outlet.sync_details(con=con)
 
@@ -380,8 +525,6 @@ async def update_menu_item_food_outlet(
 
     await menu_item.update(con=con)
 
-    disconnect(con)
-
     return {"item": obj_to_json(menu_item)}
 
 
@@ -403,10 +546,11 @@ async def update_menu_item_food_outlet(
     },
 )
 async def delete_menu_item_food_outlet(
-    id: int, item_id: int, api_key: APIKey = Depends(get_api_key)
+    id: int,
+    item_id: int,
+    api_key: APIKey = Depends(get_api_key),
+    con: connection = Depends(get_db),
 ):
-    con = connect()
-
     outlet = FoodOutlet(id=id)
     await outlet.sync_details(con=con)
 
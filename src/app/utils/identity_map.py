@@ -0,0 +1,76 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, TypeVar
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+T = TypeVar("T")
+
+# Maps (class, id) to the single instance built for it during the current
+# request, so that loaders hand out shared objects instead of rebuilding (or
+# refetching) the same row. Outside of a request scope every lookup misses and
+# nothing is remembered.
+_objects: ContextVar[dict[tuple[type, Any], Any] | None] = ContextVar(
+    "identity_map", default=None
+)
+
+
+@contextmanager
+def identity_map_scope() -> Iterator[None]:
+    token = _objects.set({})
+    try:
+        yield
+    finally:
+        _objects.reset(token)
+
+
+class IdentityMapMiddleware:
+    """
+    Opens an identity map scope around every HTTP request. It is a plain ASGI
+    middleware, so unlike `@app.middleware("http")` it leaves the request and
+    response streams alone.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with identity_map_scope():
+            await self.app(scope, receive, send)
+
+
+def lookup(cls: type[T], id: Any) -> T | None:
+    objects = _objects.get()
+    if objects is None:
+        return None
+
+    return objects.get((cls, id))
+
+
+def register(obj: T) -> T:
+    """
+    Remembers `obj` under its class and id, unless an instance is already
+    known, in which case that instance is returned instead.
+    """
+    objects = _objects.get()
+    if objects is None:
+        return obj
+
+    return objects.setdefault((type(obj), obj.id), obj)
+
+
+def get_or_build(cls: type[T], id: Any, build: Callable[[], T]) -> T:
+    obj = lookup(cls, id)
+    if obj is not None:
+        return obj
+
+    return register(build())
+
+
+def forget(cls: type, id: Any) -> None:
+    objects = _objects.get()
+    if objects is not None:
+        objects.pop((cls, id), None)
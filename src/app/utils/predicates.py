@@ -0,0 +1,64 @@
+from time import perf_counter
+from typing import Callable, Generic, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class PredicateStats:
+    def __init__(self, name: str, cost: int) -> None:
+        self.name = name
+        self.cost = cost
+        self.evaluated = 0
+        self.passed = 0
+        self.seconds = 0.0
+
+
+# Counters accumulate per predicate name over the life of the process, so the
+# stats endpoint shows how selective each filter is and how long it takes.
+_stats: dict[str, PredicateStats] = {}
+
+
+def get_predicate_stats() -> list[PredicateStats]:
+    return sorted(_stats.values(), key=lambda stats: (stats.cost, stats.name))
+
+
+class Predicate(Generic[T]):
+    """
+    A named filter with a relative cost. Cheap predicates (set lookups) should
+    have a low cost and expensive ones (distance computations) a high one.
+    """
+
+    def __init__(self, name: str, cost: int, test: Callable[[T], bool]) -> None:
+        self.name = name
+        self.cost = cost
+        self.test = test
+
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = PredicateStats(name, cost)
+        stats.cost = cost
+        self.stats = stats
+
+
+class PredicatePipeline(Generic[T]):
+    """
+    Runs predicates cheapest first and stops at the first one an item fails,
+    streaming the items that pass every predicate.
+    """
+
+    def __init__(self, predicates: Iterable[Predicate[T]]) -> None:
+        self.predicates = sorted(predicates, key=lambda predicate: predicate.cost)
+
+    def filter(self, items: Iterable[T]) -> Iterator[T]:
+        for item in items:
+            for predicate in self.predicates:
+                start = perf_counter()
+                passed = predicate.test(item)
+                predicate.stats.seconds += perf_counter() - start
+                predicate.stats.evaluated += 1
+
+                if not passed:
+                    break
+                predicate.stats.passed += 1
+            else:
+                yield item
@@ -0,0 +1,51 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Hashable
+
+
+class TTLCache:
+    """
+    A small in-process cache whose entries expire `ttl` seconds after they are
+    stored. Once `max_entries` is reached the least recently used entry is
+    dropped.
+
+    `clear()` bumps `generation`; a caller that reads the generation before
+    computing a value and passes it to `put()` will not store a result that
+    raced with a clear.
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.generation = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires, value = entry
+        if expires <= monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any, generation: int | None = None) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+
+        if generation is not None and generation != self.generation:
+            return
+
+        self._entries[key] = (monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.generation += 1
@@ -7,6 +7,11 @@ def get_config():
             "port": int(os.getenv("API_PORT")),
             "api-keys": eval(os.getenv("API_KEYS")),
             "admin-api-key": os.getenv("ADMIN_API_KEY"),
+            "timezone": os.getenv("API_TIMEZONE", "Asia/Kolkata"),
+            "search-cache-ttl": float(os.getenv("API_SEARCH_CACHE_TTL", "60")),
+            "search-cache-max-entries": int(
+                os.getenv("API_SEARCH_CACHE_MAX_ENTRIES", "1024")
+            ),
         },
         "db": {
             "host": os.getenv("DB_HOST"),
@@ -14,6 +19,10 @@ def get_config():
             "username": os.getenv("DB_USERNAME"),
             "password": os.getenv("DB_PASSWORD"),
             "database": os.getenv("DB_DATABASE"),
+            "pool-min-size": int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+            "pool-max-size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            "pool-max-idle": float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+            "pool-acquire-timeout": float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "10")),
         },
     }
 